@@ -1,27 +1,112 @@
-from django.contrib import admin
+import time
+
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.utils import timezone
+from .dashboard import close_expired_quizzes
 from .models import Quiz, Question, Option, QuizAttempt, Response, Result, Teacher, Student
+from .scoring import rescore_quiz
+
+
+class AutocompleteFilter(admin.FieldListFilter):
+    """Filter on a foreign key through the related admin's autocomplete search.
+
+    Unlike the default related filter, the sidebar never lists the related
+    table; only the selected object is loaded. Use as
+    ``list_filter = [('quiz', AutocompleteFilter)]``; the related model's
+    admin needs ``search_fields``.
+    """
+    template = 'admin/core/autocomplete_filter.html'
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        self.lookup_kwarg = f'{field_path}__{field.target_field.name}__exact'
+        super().__init__(field, request, params, model, model_admin, field_path)
+        self.admin_site = model_admin.admin_site
+
+    def expected_parameters(self):
+        return [self.lookup_kwarg]
+
+    def value(self):
+        values = self.used_parameters.get(self.lookup_kwarg)
+        return values[-1] if values else None
+
+    def choices(self, changelist):
+        yield {
+            'selected': self.value() is None,
+            'query_string': changelist.get_query_string(remove=[self.lookup_kwarg]),
+            'display': 'All',
+        }
+
+    def widget(self):
+        field = forms.ModelChoiceField(
+            queryset=self.field.remote_field.model._default_manager.all(),
+            widget=AutocompleteSelect(self.field, self.admin_site),
+            required=False,
+        )
+        return field.widget.render(self.lookup_kwarg, self.value(), attrs={'id': f'filter_{self.lookup_kwarg}'})
+
+
+@admin.action(description='Re-score all attempts of the selected quizzes')
+def rescore_quizzes(modeladmin, request, queryset):
+    # Works from quizzes and from results alike: re-score the quizzes they belong to.
+    quiz_field = 'id' if queryset.model is Quiz else 'quiz_id'
+    quiz_ids = sorted(set(queryset.values_list(quiz_field, flat=True)) - {None})
+    start = time.perf_counter()
+    rows = sum(rescore_quiz(quiz_id) for quiz_id in quiz_ids)
+    modeladmin.message_user(
+        request,
+        f'Re-scored {rows} results of {len(quiz_ids)} quizzes in {time.perf_counter() - start:.2f}s.',
+        messages.SUCCESS,
+    )
+
+
+@admin.action(description='Close the selected quizzes that have ended')
+def close_expired(modeladmin, request, queryset):
+    start = time.perf_counter()
+    closed = close_expired_quizzes(queryset)
+    modeladmin.message_user(
+        request,
+        f'Closed and graded {len(closed)} of {queryset.count()} selected quizzes in {time.perf_counter() - start:.2f}s.',
+        messages.SUCCESS,
+    )
+
+
+class FilteredAdmin(admin.ModelAdmin):
+    """Loads the select2 assets the autocomplete list filters need."""
+
+    @property
+    def media(self):
+        return super().media + AutocompleteSelect(None, self.admin_site).media
 
 
 @admin.register(Teacher)
 class TeacherAdmin(admin.ModelAdmin):
     list_display = ('user',)
+    list_select_related = ('user',)
     search_fields = ('user__username',)
 
 
 @admin.register(Student)
 class StudentAdmin(admin.ModelAdmin):
     list_display = ('user',)
+    list_select_related = ('user',)
     search_fields = ('user__username',)
 
 
 @admin.register(Quiz)
-class QuizAdmin(admin.ModelAdmin):
+class QuizAdmin(FilteredAdmin):
     list_display = ('name', 'created_by', 'start_time', 'end_time', 'is_active')
-    list_filter = ('created_by', 'start_time', 'end_time')
+    list_filter = (('created_by', AutocompleteFilter), 'start_time', 'end_time')
+    list_select_related = ('created_by__user',)
     search_fields = ('name', 'description')
+    actions = [rescore_quizzes, close_expired]
 
     def is_active(self, obj):
+        if obj.start_time is None or obj.end_time is None:
+            return False
         return obj.start_time <= timezone.now() <= obj.end_time
     is_active.boolean = True
     is_active.short_description = 'Active'
@@ -29,29 +114,39 @@ class QuizAdmin(admin.ModelAdmin):
 
 class QuestionAdmin(admin.ModelAdmin):
     list_display = ['quiz', 'text', 'correct_answer_display']
+    list_select_related = ('quiz',)
+    search_fields = ('text',)
+
+    def get_queryset(self, request):
+        correct = Option.objects.filter(question=OuterRef('pk'), is_correct=True).order_by('order', 'id')
+        return super().get_queryset(request).annotate(
+            correct_answer=Subquery(correct.values('option_text')[:1])
+        )
 
     def correct_answer_display(self, obj):
-        correct_option = obj.options_set.filter(is_correct=True).first()
-        return correct_option.option_text if correct_option else 'N/A'
+        return obj.correct_answer or 'N/A'
 
 
     correct_answer_display.short_description = 'Correct Answer'
+    correct_answer_display.admin_order_field = 'correct_answer'
 
 
 admin.site.register(Question, QuestionAdmin)
 
 
 @admin.register(Option)
-class OptionAdmin(admin.ModelAdmin):
+class OptionAdmin(FilteredAdmin):
     list_display = ('option_text', 'question', 'is_correct')
-    list_filter = ('question', 'is_correct')
+    list_filter = (('question', AutocompleteFilter), 'is_correct')
+    list_select_related = ('question__quiz',)
     search_fields = ('option_text',)
 
 
 @admin.register(QuizAttempt)
-class QuizAttemptAdmin(admin.ModelAdmin):
+class QuizAttemptAdmin(FilteredAdmin):
     list_display = ('student', 'quiz', 'start_time_display', 'completed')
-    list_filter = ('quiz', 'completed')
+    list_filter = (('quiz', AutocompleteFilter), 'completed')
+    list_select_related = ('student', 'quiz')
     search_fields = ('student__username', 'quiz__name')
 
     def start_time_display(self, obj):
@@ -60,38 +155,11 @@ class QuizAttemptAdmin(admin.ModelAdmin):
     start_time_display.short_description = 'Start Time'
 
 
-class QuizFilter(admin.SimpleListFilter):
-    title = 'Quiz'
-    parameter_name = 'quiz'
-
-    def lookups(self, request, model_admin):
-        quizzes = Quiz.objects.all()
-        return [(quiz.id, quiz.name) for quiz in quizzes]
-
-    def queryset(self, request, queryset):
-        if self.value():
-            return queryset.filter(attempt__quiz__id=self.value())
-        return queryset
-
-
-class StudentFilter(admin.SimpleListFilter):
-    title = 'Student'
-    parameter_name = 'student'
-
-    def lookups(self, request, model_admin):
-        students = Student.objects.all()
-        return [(student.id, student.user.username) for student in students]
-
-    def queryset(self, request, queryset):
-        if self.value():
-            return queryset.filter(attempt__student__id=self.value())
-        return queryset
-
-
 @admin.register(Response)
-class ResponseAdmin(admin.ModelAdmin):
+class ResponseAdmin(FilteredAdmin):
     list_display = ('student_display', 'question', 'selected_option', 'quiz_attempt_display')
-    list_filter = (QuizFilter, StudentFilter)
+    list_filter = (('attempt__quiz', AutocompleteFilter), ('attempt__student', AutocompleteFilter))
+    list_select_related = ('student__user', 'question__quiz', 'selected_option', 'attempt__quiz')
     search_fields = ('student__user__username', 'question__text')
 
     def student_display(self, obj):
@@ -103,14 +171,25 @@ class ResponseAdmin(admin.ModelAdmin):
 
 
 @admin.register(Result)
-class ResultAdmin(admin.ModelAdmin):
+class ResultAdmin(FilteredAdmin):
     list_display = ('student_display', 'quiz', 'score', 'total_questions_display')
-    list_filter = ('quiz', 'student')
+    list_filter = (('quiz', AutocompleteFilter), ('student', AutocompleteFilter))
+    list_select_related = ('student', 'quiz')
     search_fields = ('student__username', 'quiz__name')
+    actions = [rescore_quizzes]
+
+    def get_queryset(self, request):
+        questions = (
+            Question.objects.filter(quiz=OuterRef('quiz')).order_by()
+            .values('quiz').annotate(count=Count('id')).values('count')
+        )
+        return super().get_queryset(request).annotate(question_count=Coalesce(Subquery(questions), 0))
 
     def student_display(self, obj):
         return obj.student.username if obj.student else 'N/A'
 
     def total_questions_display(self, obj):
-        return obj.quiz.questions.count() if obj.quiz else 0
+        # What one attempt sees: a question pool only draws questions_per_attempt.
+        draw = obj.quiz.questions_per_attempt if obj.quiz else None
+        return min(obj.question_count, draw) if draw else obj.question_count
     total_questions_display.short_description = 'Total Questions'
@@ -0,0 +1,201 @@
+"""Item analytics for a quiz: difficulty, discrimination and distractors.
+
+Everything is derived from per-option sufficient statistics - how often
+each option was picked and the summed total score of the students who
+picked it - plus the score distribution of ``Result``. Those come from
+two grouped queries and are cached per quiz, so a read only fetches the
+responses of ``Result`` rows created since the last one.
+"""
+import numpy as np
+from django.core.cache import cache
+from django.db.models import Count, Max, Q, Sum
+
+from .answer_key import CACHE_TIMEOUT, content_version, get_answer_key
+from .models import Response, Result
+from .paper import get_paper
+
+
+def _analytics_key(quiz_id):
+    return f'quiz_analytics:{quiz_id}:{content_version(quiz_id)}'
+
+
+def _score_distribution(quiz_id, seen_up_to):
+    """(score, count, count with id <= seen_up_to, max id) per distinct score."""
+    return list(
+        Result.objects.filter(quiz_id=quiz_id)
+        .values_list('score')
+        .annotate(n=Count('id'), seen=Count('id', filter=Q(id__lte=seen_up_to)), last=Max('id'))
+        .order_by()
+    )
+
+
+def _option_picks(quiz_id, after, up_to):
+    """(option id, picks, summed total score) for results in (after, up_to]."""
+    return list(
+        Response.objects.filter(
+            attempt__result__quiz_id=quiz_id,
+            attempt__result__id__gt=after,
+            attempt__result__id__lte=up_to,
+            selected_option__isnull=False,
+        )
+        .values_list('selected_option_id')
+        .annotate(picks=Count('id'), score_sum=Sum('attempt__result__score'))
+        .order_by()
+    )
+
+
+def _empty_state(key):
+    option_ids = np.array(sorted(key.options), dtype=np.int64)
+    return {
+        'option_ids': option_ids,
+        'picks': np.zeros(len(option_ids), dtype=np.int64),
+        'score_sums': np.zeros(len(option_ids), dtype=np.int64),
+        'results': 0,
+        'seen_up_to': 0,
+    }
+
+
+def _add_picks(state, rows):
+    option_ids = state['option_ids']
+    if not rows or not len(option_ids):
+        return
+    rows = np.array(rows, dtype=np.int64)
+    positions = np.searchsorted(option_ids, rows[:, 0])
+    positions[positions == len(option_ids)] = 0
+    known = option_ids[positions] == rows[:, 0]
+    np.add.at(state['picks'], positions[known], rows[known, 1])
+    np.add.at(state['score_sums'], positions[known], rows[known, 2])
+
+
+def load_statistics(quiz_id, refresh=False):
+    """Return the cached option statistics and the current score distribution.
+
+    Only results created after the cached watermark are read. If a result
+    at or below the watermark appeared or vanished since (a late commit or
+    a deleted attempt), the statistics are rebuilt from scratch.
+    """
+    key = get_answer_key(quiz_id)
+    cache_key = _analytics_key(quiz_id)
+    state = None if refresh else cache.get(cache_key)
+
+    distribution = _score_distribution(quiz_id, state['seen_up_to'] if state else 0)
+    results = sum(n for _, n, _, _ in distribution)
+    up_to = max((last for _, _, _, last in distribution), default=0)
+
+    if state is None or sum(seen for _, _, seen, _ in distribution) != state['results']:
+        state = _empty_state(key)
+    if up_to > state['seen_up_to']:
+        _add_picks(state, _option_picks(quiz_id, state['seen_up_to'], up_to))
+        state['results'] = results
+        state['seen_up_to'] = up_to
+        cache.set(cache_key, state, CACHE_TIMEOUT)
+
+    scores = np.array([score for score, _, _, _ in distribution], dtype=np.int64)
+    counts = np.array([n for _, n, _, _ in distribution], dtype=np.int64)
+    return key, state, scores, counts
+
+
+def _or_none(values):
+    return [None if np.isnan(value) else float(value) for value in values]
+
+
+def item_statistics(key, state, scores, counts, pool=False):
+    """Vectorized per-question p-value and point-biserial discrimination.
+
+    Students who skipped a question count as getting it wrong, except in a
+    question pool (``pool``) where only students who answered it count.
+    """
+    option_ids = state['option_ids']
+    picks = state['picks'].astype(float)
+    score_sums = state['score_sums'].astype(float)
+    question_of = np.array([key.options[option_id] for option_id in option_ids.tolist()], dtype=np.int64)
+    question_ids, question_index = np.unique(question_of, return_inverse=True)
+    correct = np.isin(option_ids, np.fromiter(key.correct_options, dtype=np.int64, count=len(key.correct_options)))
+
+    total = counts.sum()
+    total_sum = float((scores * counts).sum())
+    mean = total_sum / total if total else 0.0
+    std = np.sqrt((scores.astype(float) ** 2 * counts).sum() / total - mean ** 2) if total else 0.0
+
+    size = len(question_ids)
+    answered = np.bincount(question_index, weights=picks, minlength=size)
+    n_correct = np.bincount(question_index, weights=picks * correct, minlength=size)
+    sum_correct = np.bincount(question_index, weights=score_sums * correct, minlength=size)
+    if pool:
+        base = answered
+        base_sum = np.bincount(question_index, weights=score_sums, minlength=size)
+    else:
+        base = np.full(size, float(total))
+        base_sum = np.full(size, total_sum)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        p_value = n_correct / base
+        mean_correct = sum_correct / n_correct
+        mean_wrong = (base_sum - sum_correct) / (base - n_correct)
+        discrimination = (mean_correct - mean_wrong) / std * np.sqrt(p_value * (1 - p_value))
+        share = picks / base[question_index]
+    # Everyone right or everyone wrong says nothing about discrimination.
+    discrimination[(n_correct == 0) | (n_correct == base)] = np.nan
+
+    return {
+        'question_ids': question_ids.tolist(),
+        'answered': answered.astype(int).tolist(),
+        'p_value': _or_none(p_value),
+        'discrimination': _or_none(discrimination),
+        'option_picks': dict(zip(option_ids.tolist(), picks.astype(int).tolist())),
+        'option_share': dict(zip(option_ids.tolist(), _or_none(share))),
+        'results': int(total),
+        'mean': mean,
+        'std': float(std),
+    }
+
+
+def quiz_analytics(quiz, refresh=False):
+    """Item analysis of a quiz, ready for the analytics template."""
+    key, state, scores, counts = load_statistics(quiz.id, refresh=refresh)
+    stats = item_statistics(key, state, scores, counts, pool=bool(quiz.questions_per_attempt))
+    by_question = {
+        question_id: (answered, p_value, discrimination)
+        for question_id, answered, p_value, discrimination in zip(
+            stats['question_ids'], stats['answered'], stats['p_value'], stats['discrimination']
+        )
+    }
+
+    questions = []
+    for question in get_paper(quiz)['questions']:
+        answered, p_value, discrimination = by_question.get(question['id'], (0, None, None))
+        questions.append({
+            'id': question['id'],
+            'text': question['text'],
+            'answered': answered,
+            'p_value': p_value,
+            'discrimination': discrimination,
+            'options': [
+                {
+                    'id': option['id'],
+                    'text': option['text'],
+                    'is_correct': option['id'] in key.correct_options,
+                    'picks': stats['option_picks'].get(option['id'], 0),
+                    'share': stats['option_share'].get(option['id']),
+                }
+                for option in question['options']
+            ],
+        })
+
+    histogram = dict(zip(scores.tolist(), counts.tolist()))
+    top = max([key.total_questions, *histogram])
+    distribution = [
+        {
+            'score': score,
+            'count': histogram.get(score, 0),
+            'share': histogram.get(score, 0) / stats['results'] if stats['results'] else 0,
+        }
+        for score in range(top + 1)
+    ]
+    return {
+        'questions': questions,
+        'distribution': distribution,
+        'results': stats['results'],
+        'mean': stats['mean'],
+        'std': stats['std'],
+    }
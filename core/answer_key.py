@@ -0,0 +1,113 @@
+import uuid
+from collections import namedtuple
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.utils.connection import ConnectionProxy
+
+from .models import Option, Question, Quiz
+
+AnswerKey = namedtuple(
+    'AnswerKey', ['quiz_id', 'options', 'correct', 'correct_options', 'total_questions']
+)
+
+CACHE_TIMEOUT = 60 * 60 * 24
+
+# Content versions; the state cache never culls them, so a change to a quiz
+# is not forgotten while the old answer key is still cached.
+versions = ConnectionProxy(caches, 'state')
+
+# quiz_id -> (version, AnswerKey); checked against the shared version so
+# every process drops its copy when a quiz's questions or options change.
+_local_keys = {}
+
+
+def _version_key(quiz_id):
+    return f'quiz_content_version:{quiz_id}'
+
+
+def _cache_key(quiz_id, version):
+    return f'answer_key:{quiz_id}:{version}'
+
+
+def build_answer_key(quiz_id):
+    """Compile a quiz's answer key straight from the database.
+
+    ``total_questions`` is what one attempt sees, so a question pool counts
+    only the questions drawn per attempt.
+    """
+    total_questions = Question.objects.filter(quiz_id=quiz_id).count()
+    draw = Quiz.objects.filter(pk=quiz_id).values_list('questions_per_attempt', flat=True).first()
+    if draw:
+        total_questions = min(total_questions, draw)
+    options = {}
+    correct = {}
+    correct_options = set()
+    for option_id, question_id, is_correct in (
+        Option.objects.filter(question__quiz_id=quiz_id)
+        .order_by('order', 'id')
+        .values_list('id', 'question_id', 'is_correct')
+    ):
+        options[option_id] = question_id
+        if is_correct:
+            correct.setdefault(question_id, option_id)
+            correct_options.add(option_id)
+    return AnswerKey(quiz_id, options, correct, frozenset(correct_options), total_questions)
+
+
+def content_version(quiz_id):
+    """Token that changes whenever a quiz's questions or options change."""
+    version = versions.get(_version_key(quiz_id))
+    if version is None:
+        version = uuid.uuid4().hex
+        if not versions.add(_version_key(quiz_id), version, CACHE_TIMEOUT):
+            version = versions.get(_version_key(quiz_id), version)
+    return version
+
+
+def get_answer_key(quiz_id, refresh=False):
+    """Return the compiled answer key of a quiz, building it on a cache miss."""
+    version = content_version(quiz_id)
+
+    local = _local_keys.get(quiz_id)
+    if not refresh and local is not None and local[0] == version:
+        return local[1]
+
+    key = None if refresh else cache.get(_cache_key(quiz_id, version))
+    if key is None:
+        key = build_answer_key(quiz_id)
+        cache.set(_cache_key(quiz_id, version), key, CACHE_TIMEOUT)
+    _local_keys[quiz_id] = (version, key)
+    return key
+
+
+async def aget_answer_key(quiz_id):
+    """Async ``get_answer_key``; only a cache miss leaves the event loop for the ORM."""
+    version = await versions.aget(_version_key(quiz_id))
+    local = _local_keys.get(quiz_id)
+    if version is not None and local is not None and local[0] == version:
+        return local[1]
+    key = None if version is None else await cache.aget(_cache_key(quiz_id, version))
+    if key is None:
+        return await sync_to_async(get_answer_key)(quiz_id)
+    _local_keys[quiz_id] = (version, key)
+    return key
+
+
+def invalidate_quiz_content(quiz_id):
+    """Drop the answer key and every other cache built on the content version."""
+    if quiz_id is None:
+        return
+    _local_keys.pop(quiz_id, None)
+    versions.set(_version_key(quiz_id), uuid.uuid4().hex, CACHE_TIMEOUT)
+
+
+def cache_is_shared(alias='default'):
+    """False for a local-memory cache, which no other process can see."""
+    return not isinstance(caches[alias], LocMemCache)
+
+
+def score_answers(key, option_ids):
+    """Number of correct choices among the given selected option ids."""
+    return sum(1 for option_id in option_ids if option_id in key.correct_options)
@@ -0,0 +1,104 @@
+"""Async versions of the student exam views, served under ASGI.
+
+``quiz_portal/urls.py`` routes to these instead of the views in
+``views.py`` when ``QUIZ_ASYNC_VIEWS`` is on (see ``quiz_portal/asgi.py``).
+Queries go through the async ORM; only template rendering, which may still
+touch lazy relations such as ``user.student``, runs in a worker thread: the
+request's own sync thread, like the async ORM's queries (see
+``quiz_portal/asgi.py``).
+"""
+from asgiref.sync import sync_to_async
+from django.contrib.auth.decorators import login_required
+from django.db.models import Prefetch
+from django.http import Http404
+from django.shortcuts import aget_object_or_404, redirect, render
+
+from .dashboard import aavailable_quizzes
+from .models import Option, PendingSubmission, Quiz, QuizAttempt, Response, Result, StudentQuizStatus
+from .scoring import ascore_attempt
+from .submission import asubmit_attempt
+
+arender = sync_to_async(render)
+
+
+async def _user(request):
+    user = await request.auser()
+    # Share the user loaded by login_required with the template context.
+    request.user = user
+    return user
+
+
+@login_required
+async def student_dashboard(request):
+    user = await _user(request)
+    statuses = [
+        status async for status in
+        StudentQuizStatus.objects.filter(student=user).select_related('quiz').order_by('quiz_id')
+    ]
+    submitted = [s for s in statuses if s.status != StudentQuizStatus.IN_PROGRESS]
+    in_progress_ids = {s.quiz_id for s in statuses if s.status == StudentQuizStatus.IN_PROGRESS}
+    available = await aavailable_quizzes(exclude_ids={s.quiz_id for s in submitted})
+
+    return await arender(request, 'core/student_dashboard.html', {
+        'available_quizzes': available,
+        'submitted_statuses': submitted,
+        'in_progress_ids': in_progress_ids,
+    })
+
+
+@login_required
+async def submit_quiz(request, quiz_id):
+    user = await _user(request)
+    quiz = await aget_object_or_404(Quiz, id=quiz_id)
+    attempt = await QuizAttempt.objects.filter(
+        student=user, quiz=quiz, completed=False
+    ).select_related('quiz').afirst()
+    if not attempt:
+        return redirect('quiz_result', quiz_id=quiz.id)
+
+    if request.method == 'POST':
+        await asubmit_attempt(attempt, request.POST)
+        return redirect('quiz_result', quiz_id=quiz.id)
+
+    return redirect('take_quiz', quiz_id=quiz.id)
+
+
+@login_required
+async def quiz_result(request, quiz_id):
+    user = await _user(request)
+    result = await (
+        Result.objects
+        .filter(quiz_id=quiz_id, student=user)
+        .select_related('quiz', 'attempt')
+        .order_by('-id')
+        .afirst()
+    )
+
+    if result is None:
+        attempt = await QuizAttempt.objects.filter(
+            student=user, quiz_id=quiz_id, completed=True
+        ).select_related('quiz').afirst()
+        if attempt is None:
+            raise Http404("No completed attempt for this quiz.")
+        if await PendingSubmission.objects.filter(attempt=attempt).aexists():
+            return await arender(request, 'core/quiz_result.html', {'quiz': attempt.quiz, 'grading': True})
+        result = await ascore_attempt(attempt)
+        result.quiz = attempt.quiz
+
+    responses = [
+        response async for response in
+        Response.objects.filter(attempt_id=result.attempt_id)
+        .select_related('question', 'selected_option')
+        .prefetch_related(Prefetch(
+            'question__options_set',
+            queryset=Option.objects.filter(is_correct=True),
+        ))
+    ]
+
+    return await arender(request, 'core/quiz_result.html', {
+        'quiz': result.quiz,
+        'responses': responses,
+        'score': result.score,
+        'total': result.total_questions,
+        'attempt': result.attempt,
+    })
@@ -0,0 +1,38 @@
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .dashboard import mark_in_progress
+from .deadlines import attempt_deadline
+from .models import QuizAttempt
+from .paper import new_seed
+
+
+def current_attempt(student, quiz):
+    """The student's open attempt of a quiz, else their latest completed
+    one, else None."""
+    return (
+        QuizAttempt.objects.filter(student=student, quiz=quiz)
+        .select_related('quiz').order_by('completed', '-id').first()
+    )
+
+
+def acquire_attempt(student, quiz):
+    """Return ``(attempt, created)``: the student's attempt of a quiz,
+    started now, or the open one a parallel request started first.
+
+    Called once ``current_attempt`` found nothing open, so it goes straight
+    to the INSERT. Safe against double clicks and parallel tabs: the
+    ``unique_open_attempt`` constraint lets only one concurrent insert win
+    and every other request reads the winner's row.
+    """
+    started_at = timezone.now()
+    try:
+        with transaction.atomic():
+            attempt = QuizAttempt.objects.create(
+                student=student, quiz=quiz, seed=new_seed(),
+                started_at=started_at, deadline=attempt_deadline(quiz, started_at),
+            )
+    except IntegrityError:
+        return QuizAttempt.objects.select_related('quiz').get(student=student, quiz=quiz, completed=False), False
+    mark_in_progress(student.id, quiz.id)
+    return attempt, True
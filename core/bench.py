@@ -0,0 +1,137 @@
+import shutil
+import tempfile
+import time
+import uuid
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.test.utils import override_settings
+
+from .models import Quiz, Question, Option, Student, Teacher
+
+
+def _bench_redis_location(location):
+    """``location`` with every server URL pointed at ``BENCH_REDIS_DB``."""
+    db = settings.BENCH_REDIS_DB
+    urls = location if isinstance(location, (list, tuple)) else location.split(',')
+    bench_urls = []
+    for url in urls:
+        parts = urlsplit(url)
+        if parts.scheme not in ('redis', 'rediss') or parts.query:
+            raise ImproperlyConfigured(f"Cannot point the Redis cache at {url!r} to a benchmark database.")
+        if int(parts.path.strip('/') or 0) == db:
+            raise ImproperlyConfigured(
+                f"The site's Redis cache uses database {db}, which benchmarks flush; "
+                "set BENCH_REDIS_DB to a spare database index."
+            )
+        bench_urls.append(parts._replace(path=f'/{db}').geturl())
+    return bench_urls
+
+
+@contextmanager
+def bench_caches():
+    """Swap in empty caches of the configured backends.
+
+    A fresh key prefix, for a file cache a temporary directory and for
+    Redis the spare ``BENCH_REDIS_DB`` database, so a benchmark never reads
+    entries of an earlier run and its ``clear()`` calls leave the site's
+    cache alone. Redis' ``clear()`` is ``FLUSHDB``, which a key prefix does
+    not scope.
+    """
+    prefix = f'bench-{uuid.uuid4().hex[:8]}'
+    configs, directories = {}, []
+    for alias, config in settings.CACHES.items():
+        config = dict(config, KEY_PREFIX=prefix)
+        if config['BACKEND'].endswith('FileBasedCache'):
+            config['LOCATION'] = tempfile.mkdtemp(prefix=f'quiz_portal_{prefix}_')
+            directories.append(config['LOCATION'])
+        elif config['BACKEND'].endswith('RedisCache'):
+            config['LOCATION'] = _bench_redis_location(config['LOCATION'])
+        configs[alias] = config
+    try:
+        with override_settings(CACHES=configs):
+            yield
+    finally:
+        for directory in directories:
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+@contextmanager
+def bench_database():
+    """Run a benchmark against a throwaway test database and empty caches."""
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        with bench_caches():
+            yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+@contextmanager
+def measure():
+    """Collect wall time and query count of the wrapped block."""
+    stats = {'queries': 0}
+
+    # Counted by a wrapper rather than CaptureQueriesContext, whose log
+    # stops at 9000 queries.
+    def count(execute, sql, params, many, context):
+        stats['queries'] += 1
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(count):
+        start = time.perf_counter()
+        yield stats
+        stats['seconds'] = time.perf_counter() - start
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def make_teacher(username='bench_teacher'):
+    user = User.objects.create_user(username=username, password='bench-pass')
+    return Teacher.objects.create(user=user)
+
+
+def make_students(count, prefix='bench_student'):
+    User.objects.bulk_create([
+        User(username=f'{prefix}_{i}') for i in range(count)
+    ])
+    users = list(User.objects.filter(username__startswith=f'{prefix}_').order_by('id'))
+    Student.objects.bulk_create([Student(user=user) for user in users])
+    return users
+
+
+def make_quiz(num_questions, num_options=4, teacher=None, name='Benchmark Quiz', **fields):
+    """Create a quiz whose first option of every question is correct;
+    ``fields`` are further ``Quiz`` fields (times, duration, pool size)."""
+    quiz = Quiz.objects.create(name=name, created_by=teacher, **fields)
+    Question.objects.bulk_create([
+        Question(quiz=quiz, text=f'Question {i + 1}') for i in range(num_questions)
+    ])
+    questions = list(quiz.questions.order_by('id'))
+    Option.objects.bulk_create([
+        Option(question=question, option_text=f'Option {j + 1}', is_correct=(j == 0), order=j + 1)
+        for question in questions
+        for j in range(num_options)
+    ])
+    return quiz
+
+
+def answer_sheet(quiz):
+    """POST data choosing the first option of every question."""
+    data = {}
+    for question_id, option_id in (
+        Option.objects.filter(question__quiz=quiz, order=1).values_list('question_id', 'id')
+    ):
+        data[f'question_{question_id}'] = str(option_id)
+    return data
@@ -0,0 +1,139 @@
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db.models import F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.dispatch import Signal
+from django.utils.timezone import now
+
+from .answer_key import invalidate_quiz_content
+from .models import Quiz, Result, StudentQuizStatus
+
+SCHEDULE_KEY = 'quiz_schedule'
+SCHEDULE_TIMEOUT = 60
+
+# Sent with ``quiz_ids`` once quizzes are closed after their end time.
+quiz_closed = Signal()
+
+
+def get_quiz_schedule(refresh=False, timeout=SCHEDULE_TIMEOUT):
+    """Active quizzes that have not ended yet, shared by every dashboard.
+
+    Every ``Quiz`` save invalidates the schedule, so ``timeout`` only bounds
+    how long changes made without signals (``update()``, the shell) go unseen.
+    """
+    schedule = None if refresh else cache.get(SCHEDULE_KEY)
+    if schedule is None:
+        schedule = list(
+            Quiz.objects.filter(active=True, start_time__isnull=False, end_time__gte=now())
+            .order_by('id')
+        )
+        cache.set(SCHEDULE_KEY, schedule, timeout)
+    return schedule
+
+
+def invalidate_quiz_schedule():
+    cache.delete(SCHEDULE_KEY)
+
+
+def close_expired_quizzes(quizzes=None):
+    """Deactivate the quizzes (of ``quizzes``, else all) whose end time has
+    passed, in one UPDATE; returns their ids."""
+    current = now()
+    expired = (Quiz.objects.all() if quizzes is None else quizzes).filter(active=True, end_time__lt=current)
+    quiz_ids = list(expired.values_list('id', flat=True))
+    if quiz_ids:
+        # update() skips the post_save signal, so invalidate like it would.
+        Quiz.objects.filter(id__in=quiz_ids).update(active=False, updated_at=current)
+        invalidate_quiz_schedule()
+        for quiz_id in quiz_ids:
+            invalidate_quiz_content(quiz_id)
+        quiz_closed.send(sender=Quiz, quiz_ids=quiz_ids)
+    return quiz_ids
+
+
+def _open_quizzes(schedule, exclude_ids):
+    current = now()
+    return [
+        quiz for quiz in schedule
+        if quiz.start_time <= current <= quiz.end_time and quiz.id not in exclude_ids
+    ]
+
+
+def available_quizzes(exclude_ids=()):
+    """Quizzes open right now, minus the ones in ``exclude_ids``."""
+    return _open_quizzes(get_quiz_schedule(), exclude_ids)
+
+
+async def aavailable_quizzes(exclude_ids=()):
+    schedule = await cache.aget(SCHEDULE_KEY)
+    if schedule is None:
+        schedule = await sync_to_async(get_quiz_schedule)(refresh=True)
+    return _open_quizzes(schedule, exclude_ids)
+
+
+def mark_in_progress(student_id, quiz_id):
+    """Record that a student opened a quiz, unless it is already tracked."""
+    StudentQuizStatus.objects.bulk_create(
+        [StudentQuizStatus(student_id=student_id, quiz_id=quiz_id, status=StudentQuizStatus.IN_PROGRESS)],
+        ignore_conflicts=True,
+    )
+
+
+def mark_grading(student_id, quiz_id):
+    """Record that a student's submission is waiting for the grading worker."""
+    StudentQuizStatus.objects.bulk_create(
+        [StudentQuizStatus(student_id=student_id, quiz_id=quiz_id, status=StudentQuizStatus.GRADING)],
+        update_conflicts=True,
+        unique_fields=['student', 'quiz'],
+        update_fields=['status', 'updated_at'],
+    )
+
+
+def _submitted_statuses(results):
+    # One row per student and quiz, from the latest attempt: an upsert may
+    # not touch the same row twice (PostgreSQL rejects it).
+    latest = {}
+    for result in results:
+        if result.student_id and result.quiz_id:
+            current = latest.get((result.student_id, result.quiz_id))
+            if current is None or (result.attempt_id or 0) > (current.attempt_id or 0):
+                latest[result.student_id, result.quiz_id] = result
+    return [
+        StudentQuizStatus(
+            student_id=result.student_id,
+            quiz_id=result.quiz_id,
+            status=StudentQuizStatus.SUBMITTED,
+            score=result.score,
+            total_questions=result.total_questions,
+        )
+        for result in latest.values()
+    ]
+
+
+_SUBMITTED_UPSERT = {
+    'update_conflicts': True,
+    'unique_fields': ['student', 'quiz'],
+    'update_fields': ['status', 'score', 'total_questions', 'updated_at'],
+}
+
+
+def mark_submitted(results):
+    """Upsert the dashboard rows of freshly scored results in one query."""
+    statuses = _submitted_statuses(results)
+    if statuses:
+        StudentQuizStatus.objects.bulk_create(statuses, **_SUBMITTED_UPSERT)
+
+
+async def amark_submitted(results):
+    statuses = _submitted_statuses(results)
+    if statuses:
+        await StudentQuizStatus.objects.abulk_create(statuses, **_SUBMITTED_UPSERT)
+
+
+def refresh_submitted_scores(quiz_id, total_questions):
+    """Copy re-scored results of a quiz onto its dashboard rows in one UPDATE."""
+    latest = Result.objects.filter(quiz_id=quiz_id, student_id=OuterRef('student_id')).order_by('-id')
+    return StudentQuizStatus.objects.filter(quiz_id=quiz_id, status=StudentQuizStatus.SUBMITTED).update(
+        score=Coalesce(Subquery(latest.values('score')[:1]), F('score')),
+        total_questions=total_questions,
+    )
@@ -0,0 +1,50 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F
+from django.db.models.functions import Least
+from django.utils import timezone
+
+from .models import QuizAttempt
+
+
+def attempt_deadline(quiz, started_at):
+    """When an attempt started at ``started_at`` is due: ``quiz.duration``
+    minutes later, but never after the quiz's ``end_time``."""
+    deadlines = [quiz.end_time]
+    if quiz.duration and started_at:
+        deadlines.append(started_at + timedelta(minutes=quiz.duration))
+    return min((deadline for deadline in deadlines if deadline), default=None)
+
+
+def quiz_open(quiz, now=None):
+    """Whether a new attempt may start: the quiz is active and inside its window."""
+    now = now or timezone.now()
+    return (
+        quiz.active
+        and (quiz.start_time is None or quiz.start_time <= now)
+        and (quiz.end_time is None or now <= quiz.end_time)
+    )
+
+
+def grace():
+    """Slack for answers posted right at the deadline (network, slow clicks)."""
+    return timedelta(seconds=getattr(settings, 'QUIZ_DEADLINE_GRACE_SECONDS', 30))
+
+
+def deadline_passed(attempt, now=None):
+    if attempt.deadline is None:
+        return False
+    return (now or timezone.now()) > attempt.deadline + grace()
+
+
+def reset_deadlines(quiz):
+    """Recompute the deadlines of a quiz's open attempts, in one UPDATE,
+    after its duration or end time changed."""
+    if quiz.duration:
+        deadline = F('started_at') + timedelta(minutes=quiz.duration)
+        if quiz.end_time:
+            deadline = Least(deadline, quiz.end_time)
+    else:
+        deadline = quiz.end_time
+    return QuizAttempt.objects.filter(quiz=quiz, completed=False).update(deadline=deadline)
@@ -0,0 +1,63 @@
+import csv
+import json
+
+from .answer_key import get_answer_key
+from .models import Response, Result
+
+CHUNK_SIZE = 2000
+KINDS = ('results', 'responses')
+FORMATS = ('csv', 'jsonl')
+
+RESULT_FIELDS = ['result_id', 'student', 'score', 'total_questions', 'total_attempted',
+                 'started_at', 'submitted_at']
+RESPONSE_FIELDS = ['attempt_id', 'student', 'question_id', 'selected_option_id',
+                   'selected_option', 'is_correct']
+
+
+def result_rows(quiz, chunk_size=CHUNK_SIZE):
+    return (
+        Result.objects.filter(quiz=quiz).order_by('id')
+        .values_list('id', 'student__username', 'score', 'total_questions', 'total_attempted',
+                     'attempt__started_at', 'created_at')
+        .iterator(chunk_size=chunk_size)
+    )
+
+
+def response_rows(quiz, chunk_size=CHUNK_SIZE):
+    key = get_answer_key(quiz.id)
+    rows = (
+        Response.objects.filter(attempt__quiz=quiz).order_by('attempt_id', 'question_id')
+        .values_list('attempt_id', 'attempt__student__username', 'question_id',
+                     'selected_option_id', 'selected_option__option_text')
+        .iterator(chunk_size=chunk_size)
+    )
+    for row in rows:
+        yield row + (row[3] in key.correct_options,)
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def csv_lines(header, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(header)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def jsonl_lines(header, rows):
+    for row in rows:
+        yield json.dumps(dict(zip(header, row)), default=str) + '\n'
+
+
+def export_lines(quiz, kind='results', fmt='csv', chunk_size=CHUNK_SIZE):
+    """Lines of a quiz export, produced lazily so memory stays constant."""
+    if kind == 'responses':
+        header, rows = RESPONSE_FIELDS, response_rows(quiz, chunk_size)
+    else:
+        header, rows = RESULT_FIELDS, result_rows(quiz, chunk_size)
+    if fmt == 'jsonl':
+        return jsonl_lines(header, rows)
+    return csv_lines(header, rows)
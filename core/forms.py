@@ -45,7 +45,8 @@ class QuizForm(forms.ModelForm):
 
     class Meta:
         model = Quiz
-        fields = ['name', 'description', 'start_time', 'end_time']
+        fields = ['name', 'description', 'start_time', 'end_time',
+                  'questions_per_attempt', 'shuffle_questions', 'shuffle_options']
 
 
 class QuestionForm(forms.ModelForm):
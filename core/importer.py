@@ -0,0 +1,210 @@
+import csv
+import json
+import time
+from collections import namedtuple
+
+from django.db import transaction
+
+from .answer_key import invalidate_quiz_content
+from .models import Option, Question
+
+FORMATS = ('csv', 'json', 'gift')
+BATCH_SIZE = 500
+MAX_OPTION_LENGTH = Option._meta.get_field('option_text').max_length
+
+ParsedQuestion = namedtuple('ParsedQuestion', ['line', 'text', 'options', 'correct'])
+
+
+class ImportReport:
+    def __init__(self):
+        self.imported = 0
+        self.errors = []
+        self.seconds = 0.0
+
+    @property
+    def rows_per_second(self):
+        return self.imported / self.seconds if self.seconds else 0.0
+
+    def __str__(self):
+        return (f"Imported {self.imported} questions in {self.seconds:.2f}s "
+                f"({self.rows_per_second:,.0f} rows/s), rejected {len(self.errors)}.")
+
+
+def detect_format(filename):
+    name = (filename or '').lower()
+    if name.endswith('.csv'):
+        return 'csv'
+    if name.endswith(('.json', '.jsonl', '.ndjson')):
+        return 'json'
+    return 'gift'
+
+
+def _correct_index(value, options):
+    """Accept a 1-based option number or the exact text of the option."""
+    value = str(value).strip()
+    if value in options:
+        return options.index(value)
+    if value.isdigit() and 1 <= int(value) <= len(options):
+        return int(value) - 1
+    raise ValueError(f"correct answer {value!r} matches no option")
+
+
+def parse_csv(lines):
+    """``question,option 1,...,option n,correct`` per row; a header is optional."""
+    reader = csv.reader(lines)
+    last_line = 0
+    for row in reader:
+        # A quoted cell may span lines: report the line the row starts on.
+        line_no, last_line = last_line + 1, reader.line_num
+        if not row or not any(cell.strip() for cell in row):
+            continue
+        if line_no == 1 and row[0].strip().lower() == 'question':
+            continue
+        cells = [cell.strip() for cell in row]
+        if len(cells) < 4:
+            yield line_no, None, "expected a question, at least two options and the correct answer"
+            continue
+        text, options, correct = cells[0], [c for c in cells[1:-1] if c], cells[-1]
+        try:
+            yield line_no, ParsedQuestion(line_no, text, options, _correct_index(correct, options)), None
+        except ValueError as exc:
+            yield line_no, None, str(exc)
+
+
+def parse_json(lines):
+    """One ``{"question": ..., "options": [...], "correct": ...}`` object per line."""
+    for line_no, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            item = json.loads(line)
+            text = str(item['question']).strip()
+            options = [str(option).strip() for option in item['options']]
+            correct = _correct_index(item['correct'], options)
+        except (ValueError, KeyError, TypeError) as exc:
+            yield line_no, None, f"invalid JSON question: {exc}"
+            continue
+        yield line_no, ParsedQuestion(line_no, text, options, correct), None
+
+
+def parse_gift(lines):
+    """A GIFT subset: ``Question text { =right ~wrong ~wrong }``, blank-line separated."""
+    block, start = [], None
+
+    def finish():
+        source = ' '.join(block)
+        if '::' in source:
+            parts = source.split('::')
+            if len(parts) >= 3:
+                source = '::'.join(parts[2:])
+        if '{' not in source or not source.rstrip().endswith('}'):
+            return None, "expected 'question { =right ~wrong }'"
+        text, answers = source.split('{', 1)
+        answers = answers.rstrip().rstrip('}')
+        options, correct = [], []
+        for token in answers.replace('=', '\n=').replace('~', '\n~').splitlines():
+            token = token.strip()
+            if token[:1] in ('=', '~'):
+                if token[0] == '=':
+                    correct.append(len(options))
+                options.append(token[1:].strip())
+        if len(correct) != 1:
+            return None, "expected exactly one '=' answer"
+        return ParsedQuestion(start, text.strip(), options, correct[0]), None
+
+    for line_no, line in enumerate(lines, start=1):
+        stripped = line.strip()
+        if stripped.startswith('//'):
+            continue
+        if not stripped:
+            if block:
+                parsed, error = finish()
+                yield start, parsed, error
+                block, start = [], None
+            continue
+        if start is None:
+            start = line_no
+        block.append(stripped)
+    if block:
+        parsed, error = finish()
+        yield start, parsed, error
+
+
+PARSERS = {'csv': parse_csv, 'json': parse_json, 'gift': parse_gift}
+
+
+def decode_lines(lines, report):
+    """Decode the lines of an uploaded file as UTF-8, one at a time.
+
+    A line that is not UTF-8 is rejected in the report and read as a blank
+    line, so the parsers keep their line numbers and the rest of the file
+    still imports. Text lines pass through unchanged.
+    """
+    for line_no, line in enumerate(lines, start=1):
+        if isinstance(line, bytes):
+            try:
+                line = line.decode('utf-8-sig' if line_no == 1 else 'utf-8')
+            except UnicodeDecodeError:
+                report.errors.append((line_no, "the line is not UTF-8 text"))
+                line = '\n'
+        yield line
+
+
+def validate(parsed):
+    if not parsed.text:
+        return "question text is empty"
+    if len(parsed.options) < 2:
+        return "a question needs at least two options"
+    if any(not option for option in parsed.options):
+        return "option text is empty"
+    if any(len(option) > MAX_OPTION_LENGTH for option in parsed.options):
+        return f"option longer than {MAX_OPTION_LENGTH} characters"
+    return None
+
+
+def _write_batch(quiz, batch):
+    with transaction.atomic():
+        questions = Question.objects.bulk_create([
+            Question(quiz=quiz, text=parsed.text) for parsed in batch
+        ])
+        Option.objects.bulk_create([
+            Option(question=question, option_text=option, is_correct=(i == parsed.correct), order=i + 1)
+            for question, parsed in zip(questions, batch)
+            for i, option in enumerate(parsed.options)
+        ])
+
+
+def import_questions(quiz, lines, fmt, batch_size=BATCH_SIZE):
+    """Parse, validate and store questions in one streaming pass.
+
+    ``lines`` are the raw lines of the file, bytes or text. Malformed
+    entries, undecodable lines included, are collected in the report with
+    their line number and skipped; every ``batch_size`` valid questions are
+    written with two ``bulk_create`` calls in their own transaction.
+    ``bulk_create`` sends no signals, so the quiz's cached content is
+    dropped here once anything was written, even if a later batch fails.
+    """
+    report = ImportReport()
+    start = time.perf_counter()
+    batch = []
+    try:
+        for line_no, parsed, error in PARSERS[fmt](decode_lines(lines, report)):
+            error = error or validate(parsed)
+            if error:
+                report.errors.append((line_no, error))
+                continue
+            batch.append(parsed)
+            if len(batch) >= batch_size:
+                _write_batch(quiz, batch)
+                report.imported += len(batch)
+                batch = []
+        if batch:
+            _write_batch(quiz, batch)
+            report.imported += len(batch)
+    finally:
+        if report.imported:
+            invalidate_quiz_content(quiz.id)
+    report.errors.sort(key=lambda error: error[0])
+    report.seconds = time.perf_counter() - start
+    return report
@@ -0,0 +1,94 @@
+import uuid
+
+from django.db.models import F, Q, Window
+from django.db.models.functions import Rank
+from django.template.loader import render_to_string
+
+from .models import Result
+
+PAGE_SIZE = 50
+STREAM_CHUNK_SIZE = 500
+
+
+def ranked_results(quiz):
+    """Results of a quiz ordered by (score desc, id), ranked in SQL."""
+    return (
+        Result.objects
+        .filter(quiz=quiz)
+        .select_related('student', 'attempt')
+        .annotate(rank=Window(Rank(), order_by=F('score').desc()))
+        .order_by('rank', 'id')
+    )
+
+
+def parse_cursor(value):
+    """Turn an ``after`` cursor of the form ``<score>-<id>-<rank>-<position>``
+    into a tuple."""
+    try:
+        score, pk, rank, position = value.split('-')
+        return int(score), int(pk), int(rank), int(position)
+    except (AttributeError, ValueError):
+        return None
+
+
+def leaderboard_query(quiz, cursor=None):
+    """Results of a quiz after the cursor's row, in (score desc, id) order.
+
+    Seeks on ``result_quiz_score_idx``, so a deep page reads no more rows
+    than the first one.
+    """
+    results = (
+        Result.objects
+        .filter(quiz=quiz)
+        .select_related('student', 'attempt')
+        .order_by('-score', 'id')
+    )
+    if cursor is not None:
+        score, pk = cursor[:2]
+        results = results.filter(Q(score__lt=score) | Q(score=score, id__gt=pk))
+    return results
+
+
+def leaderboard_page(quiz, cursor=None, size=PAGE_SIZE):
+    """One keyset page of the leaderboard and the cursor of the next one.
+
+    The cursor carries the last row's rank and position, so ranks continue
+    without ranking the rows before the page: a row ties the rank of the
+    row above it or, with a lower score, takes its own position.
+    """
+    score, rank, position = None, 0, 0
+    if cursor is not None:
+        score, _, rank, position = cursor
+    rows = list(leaderboard_query(quiz, cursor)[:size + 1])
+    for row in rows[:size]:
+        position += 1
+        if row.score != score:
+            score, rank = row.score, position
+        row.rank = rank
+    next_cursor = None
+    if len(rows) > size:
+        last = rows[size - 1]
+        next_cursor = f'{last.score}-{last.id}-{last.rank}-{position}'
+    return rows[:size], next_cursor
+
+
+def stream_leaderboard(request, quiz, chunk_size=STREAM_CHUNK_SIZE):
+    """Yield the full leaderboard page, sending rows as they are fetched."""
+    marker = uuid.uuid4().hex
+    page = render_to_string('core/view_responses.html', {
+        'quiz': quiz,
+        'stream': True,
+        'stream_marker': marker,
+    }, request=request)
+    head, tail = page.split(marker)
+    yield head
+
+    rows = []
+    for result in ranked_results(quiz).iterator(chunk_size=chunk_size):
+        rows.append(result)
+        if len(rows) == chunk_size:
+            yield render_to_string('core/leaderboard_rows.html', {'results': rows})
+            rows = []
+    if rows:
+        yield render_to_string('core/leaderboard_rows.html', {'results': rows})
+    yield tail
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.models import QuizAttempt
+from core.scoring import score_attempts
+
+
+class Command(BaseCommand):
+    help = "Score completed quiz attempts that have no Result yet."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--quiz', type=int, help="Only backfill attempts of this quiz id.")
+
+    def handle(self, *args, **options):
+        attempts = QuizAttempt.objects.filter(completed=True, result__isnull=True)
+        if options['quiz']:
+            attempts = attempts.filter(quiz_id=options['quiz'])
+        attempts = attempts.only('id', 'quiz_id', 'student_id').order_by('id')
+
+        last_id = 0
+        scored = 0
+        while True:
+            batch = list(attempts.filter(id__gt=last_id)[:options['batch_size']])
+            if not batch:
+                break
+            with transaction.atomic():
+                score_attempts(batch)
+            last_id = batch[-1].id
+            scored += len(batch)
+            self.stdout.write(f"Scored {scored} attempts...")
+
+        self.stdout.write(self.style.SUCCESS(f"Backfilled {scored} results."))
@@ -0,0 +1,88 @@
+import numpy as np
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+
+from core.analytics import quiz_analytics
+from core.bench import bench_database, make_quiz, make_students, measure
+from core.models import Option, QuizAttempt, Response, Result
+
+
+class Command(BaseCommand):
+    help = ("Time the item analytics of a quiz with many submissions: a cold build, "
+            "a warm read, and a read after a few new results.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--attempts', type=int, default=10_000)
+        parser.add_argument('--questions', type=int, default=100)
+        parser.add_argument('--new', type=int, default=100, help="Results added before the incremental read.")
+        parser.add_argument('--skip', type=float, default=0.02, help="Share of questions left unanswered.")
+
+    def handle(self, *args, **options):
+        with bench_database():
+            quiz = make_quiz(options['questions'], name='Analytics benchmark')
+            self.options_by_question = np.array(
+                Option.objects.filter(question__quiz=quiz).order_by('question_id', 'order')
+                .values_list('id', flat=True)
+            ).reshape(options['questions'], -1)
+            self.question_ids = sorted(set(
+                Option.objects.filter(question__quiz=quiz).values_list('question_id', flat=True)
+            ))
+            self.rng = np.random.default_rng(0)
+            self.difficulty = self.rng.normal(0, 1, options['questions'])
+
+            self.stdout.write(f"Generating {options['attempts']:,} attempts x {options['questions']} questions...")
+            self.sit(quiz, options['attempts'], 'analytics', options['skip'])
+            cache.clear()
+
+            with measure() as cold:
+                analytics = quiz_analytics(quiz)
+            with measure() as warm:
+                quiz_analytics(quiz)
+            self.sit(quiz, options['new'], 'analytics_new', options['skip'])
+            with measure() as incremental:
+                analytics = quiz_analytics(quiz)
+            with measure() as rebuild:
+                quiz_analytics(quiz, refresh=True)
+
+            hardest = min(analytics['questions'], key=lambda q: q['p_value'])
+            self.stdout.write(f"{analytics['results']:,} results, mean score {analytics['mean']:.1f}; "
+                              f"hardest question p={hardest['p_value']:.2f} "
+                              f"discrimination={hardest['discrimination']:.2f}")
+            for label, stats in (
+                ('cold build', cold), ('warm read', warm),
+                (f"+{options['new']} results", incremental), ('forced rebuild', rebuild),
+            ):
+                self.stdout.write(f"{label:<16} {stats['seconds'] * 1000:>9.1f} ms  {stats['queries']:>3} queries")
+
+    def sit(self, quiz, count, prefix, skip):
+        """Bulk-insert completed attempts answered by a simple ability model."""
+        students = make_students(count, prefix=prefix)
+        attempts = QuizAttempt.objects.bulk_create([
+            QuizAttempt(student=student, quiz=quiz, completed=True) for student in students
+        ])
+        num_options = self.options_by_question.shape[1]
+
+        ability = self.rng.normal(0, 1, (count, 1))
+        correct = self.rng.random((count, len(self.question_ids))) < 1 / (1 + np.exp(self.difficulty - ability))
+        # Wrong answers favour the second option, so every question has a strong distractor.
+        weights = np.linspace(2, 1, num_options - 1)
+        distractor = self.rng.choice(np.arange(1, num_options), size=correct.shape, p=weights / weights.sum())
+        picked = np.where(correct, 0, distractor)
+        answered = self.rng.random(correct.shape) >= skip
+        option_ids = self.options_by_question[np.arange(len(self.question_ids)), picked]
+
+        for start in range(0, count, 500):
+            Response.objects.bulk_create([
+                Response(attempt=attempt, question_id=question_id, selected_option_id=option_id)
+                for attempt, row, mask in zip(
+                    attempts[start:start + 500], option_ids[start:start + 500].tolist(),
+                    answered[start:start + 500].tolist(),
+                )
+                for question_id, option_id, keep in zip(self.question_ids, row, mask) if keep
+            ], batch_size=5000)
+        scores = (correct & answered).sum(axis=1)
+        Result.objects.bulk_create([
+            Result(attempt=attempt, quiz=quiz, student=attempt.student, score=int(score),
+                   total_questions=len(self.question_ids), total_attempted=int(mask.sum()))
+            for attempt, score, mask in zip(attempts, scores, answered)
+        ], batch_size=5000)
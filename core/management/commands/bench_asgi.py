@@ -0,0 +1,190 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from urllib.error import URLError
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.sessions.backends.db import SessionStore
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.crypto import get_random_string
+
+from core.bench import make_quiz, make_students, percentile
+from core.models import PendingSubmission
+
+from .loadtest import RADIO_RE, Browser
+
+SESSION_KEY_CHARS = 'abcdefghijklmnopqrstuvwxyz0123456789'
+
+
+class Command(BaseCommand):
+    help = ("Start the app under gunicorn (WSGI) and uvicorn (ASGI with async views) in turn "
+            "and hit each with the same burst of concurrent submitters. A '-queue' mode "
+            "(e.g. wsgi-queue) turns on QUIZ_SUBMIT_QUEUE and runs the grading worker. "
+            "Writes to the configured database, so run migrate first.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--submitters', type=int, default=1000)
+        parser.add_argument('--questions', type=int, default=20)
+        parser.add_argument('--workers', type=int, default=2, help="Server processes per mode.")
+        parser.add_argument('--threads', type=int, default=16, help="Threads per gunicorn worker.")
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--timeout', type=float, default=120.0)
+        parser.add_argument('--modes', default='wsgi,asgi')
+        parser.add_argument('--grade-after-burst', action='store_true',
+                            help="Start the grading worker of a '-queue' mode only once the burst is over, "
+                                 "as if it ran on its own host.")
+
+    def handle(self, *args, **options):
+        self.timeout = options['timeout']
+        self.base_url = f"http://127.0.0.1:{options['port']}"
+        quiz = make_quiz(options['questions'], name='ASGI benchmark quiz')
+        current = timezone.now()
+        quiz.start_time = current - timedelta(minutes=1)
+        quiz.end_time = current + timedelta(hours=1)
+        quiz.save()
+        self.quiz_id = quiz.id
+
+        self.stdout.write(f"{options['submitters']} concurrent submitters on quiz {quiz.id}, "
+                          f"{options['workers']} server processes per mode")
+        for mode in options['modes'].split(','):
+            sessions = self.make_sessions(options['submitters'])
+            server, queue = mode.removesuffix('-queue'), mode.endswith('-queue')
+            processes = [self.start_server(server, queue, options)]
+            if queue and not options['grade_after_burst']:
+                processes.append(self.start_worker())
+            try:
+                self.run_burst(mode, sessions)
+                if queue:
+                    if options['grade_after_burst']:
+                        processes.append(self.start_worker())
+                    self.wait_for_grading(processes[-1])
+            finally:
+                for process in processes:
+                    process.terminate()
+                    process.wait(timeout=30)
+
+    def make_sessions(self, count):
+        """Log students in by writing their sessions directly, skipping password hashing."""
+        users = make_students(count, prefix=f'asgi_{uuid.uuid4().hex[:8]}')
+        store = SessionStore()
+        expire = timezone.now() + timedelta(hours=1)
+        sessions = []
+        for user in users:
+            sessions.append(Session(
+                session_key=get_random_string(32, SESSION_KEY_CHARS),
+                session_data=store.encode({
+                    SESSION_KEY: str(user.pk),
+                    BACKEND_SESSION_KEY: 'django.contrib.auth.backends.ModelBackend',
+                    HASH_SESSION_KEY: user.get_session_auth_hash(),
+                }),
+                expire_date=expire,
+            ))
+        Session.objects.bulk_create(sessions)
+        return [session.session_key for session in sessions]
+
+    def start_server(self, mode, queue, options):
+        bind = ['--bind', f"127.0.0.1:{options['port']}"]
+        env = dict(os.environ, QUIZ_SUBMIT_QUEUE='1' if queue else '')
+        if mode == 'wsgi':
+            command = [sys.executable, '-m', 'gunicorn', 'quiz_portal.wsgi', *bind,
+                       '--workers', str(options['workers']), '--threads', str(options['threads']),
+                       '--backlog', '2048', '--timeout', '300']
+            env['QUIZ_ASYNC_VIEWS'] = ''
+        elif mode == 'asgi':
+            command = [sys.executable, '-m', 'uvicorn', 'quiz_portal.asgi:application',
+                       '--port', str(options['port']), '--workers', str(options['workers']),
+                       '--backlog', '2048', '--log-level', 'warning', '--no-access-log']
+            env['QUIZ_ASYNC_VIEWS'] = '1'
+        else:
+            raise CommandError(f"Unknown mode {mode!r}; use wsgi, asgi, wsgi-queue or asgi-queue.")
+
+        server = subprocess.Popen(command, cwd=settings.BASE_DIR, env=env)
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            try:
+                Browser(self.base_url, 1).request(reverse('landing'))
+                return server
+            except (URLError, OSError):
+                time.sleep(0.2)
+        server.terminate()
+        raise CommandError(f"The {mode} server did not start on {self.base_url}.")
+
+    def start_worker(self):
+        return subprocess.Popen(
+            [sys.executable, 'manage.py', 'process_submissions', '--loop', '--interval', '0.2'],
+            cwd=settings.BASE_DIR, env=dict(os.environ, QUIZ_SUBMIT_QUEUE='1'),
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+
+    def step(self, name, browser, path, data=None, expect=(200, 302)):
+        start = time.perf_counter()
+        try:
+            status, body = browser.request(path, data)
+        except (URLError, OSError):
+            status, body = None, ''
+        self.samples[name].append(time.perf_counter() - start)
+        if status not in expect:
+            self.errors[name] += 1
+            return None
+        return body
+
+    def run_burst(self, mode, sessions):
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+        barrier = threading.Barrier(len(sessions))
+        walls = {}
+
+        def student(session_key):
+            browser = Browser(self.base_url, self.timeout)
+            browser.set_cookie(settings.SESSION_COOKIE_NAME, session_key)
+            paper = self.step('take_quiz', browser, reverse('take_quiz', args=[self.quiz_id]), expect=(200,))
+            answers = {}
+            for name, value in RADIO_RE.findall(paper or ''):
+                answers.setdefault(name, value)
+            # Everybody presses submit at the same moment.
+            barrier.wait()
+            walls.setdefault('start', time.perf_counter())
+            if paper is None:
+                return
+            self.step('submit_quiz', browser, reverse('submit_quiz', args=[self.quiz_id]), answers, expect=(302,))
+            self.step('quiz_result', browser, reverse('quiz_result', args=[self.quiz_id]), expect=(200,))
+            self.step('dashboard', browser, reverse('student_dashboard'), expect=(200,))
+
+        with ThreadPoolExecutor(max_workers=len(sessions)) as pool:
+            list(pool.map(student, sessions))
+        self.burst_start = walls['start']
+        wall = time.perf_counter() - walls['start']
+
+        self.stdout.write(f"\n[{mode}] burst finished in {wall:.2f}s")
+        self.stdout.write(
+            f"{'step':<12} {'count':>6} {'errors':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}"
+        )
+        for name in ('take_quiz', 'submit_quiz', 'quiz_result', 'dashboard'):
+            samples = self.samples.get(name)
+            if not samples:
+                continue
+            self.stdout.write(
+                f"{name:<12} {len(samples):>6} {self.errors[name]:>6} "
+                f"{percentile(samples, 50) * 1000:>8.1f} {percentile(samples, 95) * 1000:>8.1f} "
+                f"{percentile(samples, 99) * 1000:>8.1f} {max(samples) * 1000:>8.1f}"
+            )
+        submitted = len(self.samples['submit_quiz']) - self.errors['submit_quiz']
+        self.stdout.write(self.style.SUCCESS(f"{submitted / wall:.1f} submissions/s"))
+
+    def wait_for_grading(self, worker):
+        pending = PendingSubmission.objects.filter(attempt__quiz_id=self.quiz_id)
+        while pending.exists():
+            if worker.poll() is not None:
+                raise CommandError("The grading worker exited before the queue was drained.")
+            time.sleep(0.1)
+        self.stdout.write(f"queue drained {time.perf_counter() - self.burst_start:.2f}s after the burst started")
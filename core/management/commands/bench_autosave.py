@@ -0,0 +1,82 @@
+import random
+import sys
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings
+
+from core.bench import bench_database, make_quiz, make_students
+from core.models import Option, QuizAttempt
+from core.submission import flush_interval, save_answers
+
+WRITE_VERBS = ('INSERT', 'UPDATE', 'DELETE')
+
+
+class Command(BaseCommand):
+    help = ("Simulate students autosaving every few seconds and compare database "
+            "writes with and without cache write coalescing.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=200)
+        parser.add_argument('--questions', type=int, default=30)
+        parser.add_argument('--minutes', type=int, default=10)
+        parser.add_argument('--every', type=float, default=5.0, help="Seconds between autosave batches.")
+        parser.add_argument('--flush', type=int, default=30, help="Coalescing flush interval in seconds.")
+
+    def handle(self, *args, **options):
+        with bench_database():
+            quiz = make_quiz(options['questions'], name='Autosave benchmark')
+            students = make_students(options['students'], prefix='autosave')
+            choices = {}
+            for question_id, option_id in Option.objects.filter(
+                question__quiz=quiz
+            ).values_list('question_id', 'id'):
+                choices.setdefault(question_id, []).append(option_id)
+
+            self.stdout.write(f"{options['students']} students, {options['questions']} questions, "
+                              f"a batch every {options['every']:g}s for {options['minutes']} min")
+            state = settings.CACHES['state']
+            with override_settings(QUIZ_AUTOSAVE_FLUSH_SECONDS=options['flush']):
+                if not flush_interval():
+                    # One process, so local memory stands in for Redis.
+                    self.stdout.write("The state cache cannot coalesce; measuring on local memory.")
+                    state = {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                             'LOCATION': 'bench-autosave', 'OPTIONS': {'MAX_ENTRIES': sys.maxsize}}
+            with override_settings(CACHES=dict(settings.CACHES, state=state)):
+                for label, interval in (('write-through', 0), (f"coalesced ({options['flush']}s)", options['flush'])):
+                    writes = self.run(quiz, students, choices, interval, options)
+                    per_minute = writes / options['students'] / options['minutes']
+                    self.stdout.write(f"{label:<18} {writes:>8} writes  {per_minute:>6.1f} writes/student/min")
+
+    def run(self, quiz, students, choices, interval, options):
+        caches['state'].clear()
+        QuizAttempt.objects.filter(quiz=quiz).delete()
+        attempts = QuizAttempt.objects.bulk_create([
+            QuizAttempt(student=student, quiz=quiz) for student in students
+        ])
+        for attempt in attempts:
+            attempt.quiz = quiz
+
+        rng = random.Random(0)
+        question_ids = list(choices)
+        ticks = int(options['minutes'] * 60 / options['every'])
+        writes = []
+
+        def count_writes(execute, sql, params, many, context):
+            if sql.lstrip().upper().startswith(WRITE_VERBS):
+                writes.append(sql)
+            return execute(sql, params, many, context)
+
+        with override_settings(QUIZ_AUTOSAVE_FLUSH_SECONDS=interval), \
+                connection.execute_wrapper(count_writes):
+            for tick in range(ticks):
+                now = tick * options['every']
+                for attempt in attempts:
+                    batch = {
+                        f'question_{question_id}': str(rng.choice(choices[question_id]))
+                        for question_id in rng.sample(question_ids, 2)
+                    }
+                    save_answers(attempt, batch, now=now)
+        return len(writes)
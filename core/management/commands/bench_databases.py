@@ -0,0 +1,75 @@
+import os
+import re
+import subprocess
+import sys
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+SUBMIT_RE = re.compile(r'^submit_quiz\s+(\d+)\s+(\d+)\s+([\d.]+)\s+([\d.]+)\s+([\d.]+)')
+RATE_RE = re.compile(r'^([\d.]+) submissions/s')
+
+
+class Command(BaseCommand):
+    help = ("Compare concurrent submit throughput across database profiles: stock SQLite, "
+            "SQLite with WAL and busy timeout, and PostgreSQL with persistent connections "
+            "or the connection pool. Each profile runs bench_asgi against a fresh database; "
+            "the PostgreSQL profiles use the DATABASE_* environment and need an empty database.")
+
+    PROFILES = {
+        'sqlite-default': {'DATABASE_ENGINE': 'sqlite', 'SQLITE_TUNING': '0'},
+        'sqlite-wal': {'DATABASE_ENGINE': 'sqlite', 'SQLITE_TUNING': '1'},
+        'postgresql': {'DATABASE_ENGINE': 'postgresql', 'DATABASE_POOL': ''},
+        'postgresql-pooled': {'DATABASE_ENGINE': 'postgresql', 'DATABASE_POOL': '1'},
+    }
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profiles', default='sqlite-default,sqlite-wal,postgresql-pooled')
+        parser.add_argument('--submitters', type=int, default=300)
+        parser.add_argument('--questions', type=int, default=20)
+        parser.add_argument('--mode', default='wsgi', help="bench_asgi mode to run under each profile.")
+
+    def handle(self, *args, **options):
+        rows = []
+        with tempfile.TemporaryDirectory() as tmp:
+            for name in options['profiles'].split(','):
+                if name not in self.PROFILES:
+                    raise CommandError(f"Unknown profile {name!r}; choose from {', '.join(self.PROFILES)}.")
+                env = dict(os.environ, **self.PROFILES[name])
+                if env['DATABASE_ENGINE'] == 'sqlite':
+                    env['DATABASE_NAME'] = os.path.join(tmp, f'{name}.sqlite3')
+
+                self.stdout.write(f"\n== {name} ==")
+                self.manage(env, 'migrate', '--verbosity', '0')
+                output = self.manage(
+                    env, 'bench_asgi', '--modes', options['mode'],
+                    '--submitters', str(options['submitters']), '--questions', str(options['questions']),
+                )
+                self.stdout.write(output)
+                rows.append((name, output))
+                if env['DATABASE_ENGINE'] == 'postgresql':
+                    self.manage(env, 'flush', '--no-input', '--verbosity', '0')
+
+        self.stdout.write(f"\n{'profile':<18} {'submits/s':>10} {'errors':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+        for name, output in rows:
+            submit = rate = None
+            for line in output.splitlines():
+                submit = submit or SUBMIT_RE.match(line)
+                rate = rate or RATE_RE.match(line)
+            if not (submit and rate):
+                self.stdout.write(f"{name:<18} {'no result':>10}")
+                continue
+            self.stdout.write(
+                f"{name:<18} {float(rate[1]):>10.1f} {submit[2]:>7} {float(submit[3]):>9.1f} "
+                f"{float(submit[4]):>9.1f} {float(submit[5]):>9.1f}"
+            )
+
+    def manage(self, env, *args):
+        process = subprocess.run(
+            [sys.executable, 'manage.py', *args],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        )
+        if process.returncode:
+            raise CommandError(f"manage.py {' '.join(args)} failed:\n{process.stderr[-2000:]}")
+        return process.stdout
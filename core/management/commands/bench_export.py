@@ -0,0 +1,101 @@
+import os
+import resource
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.bench import bench_database, make_quiz, make_students
+from core.export import export_lines
+from core.models import Option, QuizAttempt, Response, Result
+
+
+def current_rss():
+    """Resident set size in bytes, or None where /proc is unavailable."""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return None
+
+
+class RssSampler(threading.Thread):
+    def __init__(self, interval=0.01):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak = current_rss() or 0
+        self.running = True
+
+    def run(self):
+        while self.running:
+            self.peak = max(self.peak, current_rss() or 0)
+            time.sleep(self.interval)
+
+    def stop(self):
+        self.running = False
+        self.join()
+        return self.peak
+
+
+class Command(BaseCommand):
+    help = "Benchmark exporting a quiz's responses and report peak RSS."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--responses', type=int, default=1_000_000)
+        parser.add_argument('--questions', type=int, default=100)
+        parser.add_argument('--format', choices=('csv', 'jsonl'), default='csv')
+
+    def handle(self, *args, **options):
+        with bench_database():
+            quiz = self.seed(options['responses'], options['questions'])
+            self.export(quiz, 'responses', options['format'])
+            self.export(quiz, 'results', options['format'])
+
+    def seed(self, num_responses, num_questions):
+        num_attempts = max(1, num_responses // num_questions)
+        self.stdout.write(f"Seeding {num_attempts} attempts x {num_questions} questions...")
+        quiz = make_quiz(num_questions)
+        users = make_students(num_attempts)
+        QuizAttempt.objects.bulk_create(
+            [QuizAttempt(student=user, quiz=quiz, completed=True) for user in users], batch_size=5000
+        )
+        choices = list(Option.objects.filter(question__quiz=quiz, order=1).values_list('question_id', 'id'))
+        batch = []
+        for attempt_id in QuizAttempt.objects.filter(quiz=quiz).values_list('id', flat=True).iterator():
+            batch.extend(
+                Response(attempt_id=attempt_id, question_id=question_id, selected_option_id=option_id)
+                for question_id, option_id in choices
+            )
+            if len(batch) >= 20000:
+                Response.objects.bulk_create(batch, batch_size=5000)
+                batch = []
+        Response.objects.bulk_create(batch, batch_size=5000)
+        Result.objects.bulk_create([
+            Result(attempt=attempt, quiz=quiz, student_id=attempt.student_id, score=num_questions,
+                   total_questions=num_questions, total_attempted=num_questions)
+            for attempt in QuizAttempt.objects.filter(quiz=quiz).only('id', 'student_id')
+        ], batch_size=5000)
+        return quiz
+
+    def export(self, quiz, kind, fmt):
+        baseline = current_rss()
+        sampler = RssSampler()
+        sampler.start()
+        start = time.perf_counter()
+        rows = size = 0
+        with open(os.devnull, 'w') as sink:
+            for line in export_lines(quiz, kind, fmt):
+                sink.write(line)
+                rows += 1
+                size += len(line)
+        elapsed = time.perf_counter() - start
+        peak = sampler.stop()
+
+        self.stdout.write(f"{kind} as {fmt}: {rows - (fmt == 'csv')} rows, {size / 2**20:.1f} MiB "
+                          f"in {elapsed:.2f}s ({rows / elapsed:,.0f} rows/s)")
+        if baseline is not None:
+            self.stdout.write(f"  RSS before {baseline / 2**20:.1f} MiB, peak {peak / 2**20:.1f} MiB "
+                              f"(+{(peak - baseline) / 2**20:.1f} MiB)")
+        else:
+            maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            self.stdout.write(f"  process max RSS {maxrss} (platform units)")
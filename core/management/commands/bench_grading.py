@@ -0,0 +1,53 @@
+import random
+
+from django.core.management.base import BaseCommand
+
+from core.bench import bench_database, make_quiz, make_students, measure
+from core.models import Option, QuizAttempt, Response, Result, StudentQuizStatus
+from core.scoring import grade_quiz, score_attempt
+
+
+class Command(BaseCommand):
+    help = "Compare grading a whole quiz with grade_quiz against scoring attempt by attempt."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--attempts', type=int, default=10_000)
+        parser.add_argument('--questions', type=int, default=20)
+
+    def handle(self, *args, **options):
+        with bench_database():
+            quiz = make_quiz(options['questions'], name='Grading benchmark')
+            choices = {}
+            for question_id, option_id in Option.objects.filter(question__quiz=quiz).values_list('question_id', 'id'):
+                choices.setdefault(question_id, []).append(option_id)
+
+            self.stdout.write(f"{options['attempts']:,} completed attempts x {options['questions']} questions")
+            students = make_students(options['attempts'], prefix='grading')
+            attempts = QuizAttempt.objects.bulk_create([
+                QuizAttempt(student=student, quiz=quiz, completed=True) for student in students
+            ])
+            rng = random.Random(0)
+            for start in range(0, len(attempts), 1000):
+                Response.objects.bulk_create([
+                    Response(attempt=attempt, question_id=question_id, selected_option_id=rng.choice(option_ids))
+                    for attempt in attempts[start:start + 1000]
+                    for question_id, option_ids in choices.items()
+                ], batch_size=5000)
+
+            def per_attempt():
+                for attempt in attempts:
+                    score_attempt(attempt)
+
+            runs = []
+            for label, grade in (('score_attempt', per_attempt), ('grade_quiz', lambda: grade_quiz(quiz.id))):
+                Result.objects.all().delete()
+                StudentQuizStatus.objects.all().delete()
+                with measure() as stats:
+                    grade()
+                runs.append((label, stats, list(Result.objects.order_by('attempt_id').values_list('score', flat=True))))
+
+            self.stdout.write(f"{'path':<15} {'seconds':>8} {'queries':>8} {'attempts/s':>11}")
+            for label, stats, _ in runs:
+                self.stdout.write(f"{label:<15} {stats['seconds']:>8.2f} {stats['queries']:>8} "
+                                  f"{len(attempts) / stats['seconds']:>11,.0f}")
+            self.stdout.write(f"Same scores: {runs[0][2] == runs[1][2]}")
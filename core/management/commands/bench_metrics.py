@@ -0,0 +1,53 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from core.bench import bench_database, make_quiz, make_students, percentile
+from core.metrics import registry
+
+MIDDLEWARE = 'core.middleware.RequestMetricsMiddleware'
+
+
+class Command(BaseCommand):
+    help = "Benchmark the overhead of RequestMetricsMiddleware on student_dashboard."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500)
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        try:
+            with bench_database(), override_settings(ALLOWED_HOSTS=['*']):
+                self.run(options['requests'])
+        finally:
+            teardown_test_environment()
+
+    def run(self, requests):
+        make_quiz(10)
+        user = make_students(1)[0]
+        without = [m for m in settings.MIDDLEWARE if m != MIDDLEWARE]
+        modes = (
+            ('absent', without, False),
+            ('disabled', [MIDDLEWARE] + without, False),
+            ('enabled', [MIDDLEWARE] + without, True),
+        )
+        self.stdout.write(f"{requests} GET /student/dashboard/ per mode")
+        self.stdout.write(f"{'middleware':>10} {'mean ms':>8} {'p50 ms':>8} {'p99 ms':>8}")
+        for label, middleware, enabled in modes:
+            with override_settings(MIDDLEWARE=middleware, QUIZ_METRICS=enabled):
+                client = Client()
+                client.force_login(user)
+                client.get('/student/dashboard/')
+                samples = []
+                for _ in range(requests):
+                    start = time.perf_counter()
+                    client.get('/student/dashboard/')
+                    samples.append(time.perf_counter() - start)
+            self.stdout.write(
+                f"{label:>10} {sum(samples) / len(samples) * 1000:>8.3f} "
+                f"{percentile(samples, 50) * 1000:>8.3f} {percentile(samples, 99) * 1000:>8.3f}"
+            )
+        registry.reset()
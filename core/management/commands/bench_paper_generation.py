@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.paper import generate_paper
+
+
+class Command(BaseCommand):
+    help = "Benchmark per-attempt paper generation from a question pool."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pool', type=int, default=500, help="Questions in the pool (N).")
+        parser.add_argument('--draw', type=int, default=50, help="Questions per attempt (K).")
+        parser.add_argument('--options', type=int, default=4)
+        parser.add_argument('--attempts', type=int, default=20000)
+
+    def handle(self, *args, **options):
+        pool = [
+            {'id': i, 'text': f'Question {i}',
+             'options': [{'id': i * 10 + j, 'text': f'Option {j}'} for j in range(options['options'])]}
+            for i in range(options['pool'])
+        ]
+        self.stdout.write(f"N={options['pool']} K={options['draw']} options={options['options']}, "
+                          f"{options['attempts']} attempts on one core")
+        for label, shuffle_questions, shuffle_options in (
+            ('draw only', False, False),
+            ('draw + shuffle questions', True, False),
+            ('draw + shuffle both', True, True),
+        ):
+            start = time.perf_counter()
+            for seed in range(options['attempts']):
+                generate_paper(pool, seed, options['draw'], shuffle_questions, shuffle_options)
+            elapsed = time.perf_counter() - start
+            self.stdout.write(f"{label:<26} {options['attempts'] / elapsed:>10,.0f} attempts/s")
@@ -0,0 +1,62 @@
+import random
+
+from django.core.management.base import BaseCommand
+
+from core.bench import bench_database, make_quiz, make_students, measure
+from core.dashboard import mark_submitted
+from core.models import Option, QuizAttempt, Response, Result
+from core.scoring import rescore_quiz, score_attempt
+
+
+class Command(BaseCommand):
+    help = ("Time the admin re-score action on a quiz with many submissions, "
+            "against re-scoring a sample of attempts one by one.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--attempts', type=int, default=50_000)
+        parser.add_argument('--questions', type=int, default=10)
+        parser.add_argument('--sample', type=int, default=500,
+                            help="Attempts re-scored one by one for the per-attempt estimate.")
+
+    def handle(self, *args, **options):
+        with bench_database():
+            quiz = make_quiz(options['questions'], name='Rescore benchmark')
+            choices = {}
+            for question_id, option_id in Option.objects.filter(question__quiz=quiz).values_list('question_id', 'id'):
+                choices.setdefault(question_id, []).append(option_id)
+
+            self.stdout.write(f"Generating {options['attempts']:,} attempts x {options['questions']} questions...")
+            students = make_students(options['attempts'], prefix='rescore')
+            attempts = QuizAttempt.objects.bulk_create([
+                QuizAttempt(student=student, quiz=quiz, completed=True) for student in students
+            ])
+            rng = random.Random(0)
+            for start in range(0, len(attempts), 1000):
+                Response.objects.bulk_create([
+                    Response(attempt=attempt, question_id=question_id, selected_option_id=rng.choice(option_ids))
+                    for attempt in attempts[start:start + 1000]
+                    for question_id, option_ids in choices.items()
+                ], batch_size=5000)
+            results = Result.objects.bulk_create([
+                Result(attempt=attempt, quiz=quiz, student=attempt.student, score=0,
+                       total_questions=options['questions'], total_attempted=options['questions'])
+                for attempt in attempts
+            ], batch_size=5000)
+            mark_submitted(results)
+
+            # Fix the answer key: the second option of every question was right.
+            Option.objects.filter(question__quiz=quiz).update(is_correct=False)
+            Option.objects.filter(question__quiz=quiz, order=2).update(is_correct=True)
+
+            with measure() as bulk:
+                rows = rescore_quiz(quiz.id)
+            with measure() as one_by_one:
+                for attempt in attempts[:options['sample']]:
+                    score_attempt(attempt)
+            per_attempt = one_by_one['seconds'] / options['sample']
+
+            self.stdout.write(f"rescore_quiz     {rows:>7,} results  {bulk['seconds']:>7.2f}s  "
+                              f"{bulk['queries']:>6} queries")
+            self.stdout.write(f"score_attempt    {options['sample']:>7,} results  {one_by_one['seconds']:>7.2f}s  "
+                              f"{one_by_one['queries']:>6} queries  "
+                              f"(~{per_attempt * len(attempts):.1f}s for all {len(attempts):,})")
@@ -0,0 +1,52 @@
+import time
+
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from core.bench import bench_database, make_quiz, make_students
+from core.dashboard import mark_in_progress
+
+ENGINES = (
+    ('db sessions', 'django.contrib.sessions.backends.db'),
+    ('cached_db sessions', 'django.contrib.sessions.backends.cached_db'),
+)
+
+
+class Command(BaseCommand):
+    help = "Compare queries and latency per student_dashboard request with db and cached_db sessions."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--quizzes', type=int, default=20)
+
+    def handle(self, *args, **options):
+        with bench_database():
+            student = make_students(1, prefix='session_bench')[0]
+            for i in range(options['quizzes']):
+                quiz = make_quiz(5, name=f'Session bench quiz {i}')
+                mark_in_progress(student.id, quiz.id)
+
+            self.stdout.write(f"{options['requests']} student_dashboard requests per engine")
+            for label, engine in ENGINES:
+                caches['default'].clear()
+                caches['sessions'].clear()
+                with override_settings(SESSION_ENGINE=engine):
+                    client = Client()
+                    client.force_login(student)
+                    client.get(reverse('student_dashboard'))
+
+                    with CaptureQueriesContext(connection) as ctx:
+                        start = time.perf_counter()
+                        for _ in range(options['requests']):
+                            client.get(reverse('student_dashboard'))
+                        seconds = time.perf_counter() - start
+                session_queries = sum('django_session' in query['sql'] for query in ctx.captured_queries)
+                self.stdout.write(
+                    f"{label:<20} {len(ctx) / options['requests']:>5.1f} queries/request "
+                    f"({session_queries / options['requests']:.1f} on django_session)  "
+                    f"{seconds / options['requests'] * 1000:>6.2f} ms/request"
+                )
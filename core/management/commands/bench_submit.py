@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.bench import bench_database, measure, make_quiz, make_students, answer_sheet
+from core.models import Option, QuizAttempt, Response
+from core.submission import submit_attempt
+
+
+def legacy_submit(attempt, data):
+    """The per-question loop ``submit_quiz`` used before the bulk engine."""
+    Response.objects.filter(attempt=attempt).delete()
+    for question in attempt.quiz.questions.all():
+        sel_id = data.get(f'question_{question.id}')
+        if sel_id:
+            opt = Option.objects.get(id=sel_id, question=question)
+            Response.objects.create(attempt=attempt, question=question, selected_option=opt)
+    attempt.completed = True
+    attempt.save()
+
+
+class Command(BaseCommand):
+    help = "Benchmark query count and wall time of a quiz submission."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--questions', type=int, nargs='+', default=[10, 100, 500])
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        with bench_database():
+            students = make_students(options['repeat'] * 2)
+            self.stdout.write(f"{'questions':>10} {'path':>8} {'queries':>8} {'ms/submit':>10}")
+            for num_questions in options['questions']:
+                quiz = make_quiz(num_questions, name=f'Bench {num_questions}')
+                data = answer_sheet(quiz)
+                users = iter(students)
+                for label, submit in (('legacy', legacy_submit), ('bulk', submit_attempt)):
+                    runs = []
+                    for _ in range(options['repeat']):
+                        attempt = QuizAttempt.objects.create(student=next(users), quiz=quiz)
+                        with measure() as stats, transaction.atomic():
+                            submit(attempt, data)
+                        runs.append(stats)
+                    queries = runs[-1]['queries']
+                    ms = sum(run['seconds'] for run in runs) / len(runs) * 1000
+                    self.stdout.write(f'{num_questions:>10} {label:>8} {queries:>8} {ms:>10.2f}')
@@ -0,0 +1,71 @@
+import random
+import time
+import tracemalloc
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.bench import bench_database, make_quiz, make_students, measure, percentile
+from core.models import Option, QuizAttempt, Result
+from core.submission import save_answers, submit_expired_attempts
+
+
+class Command(BaseCommand):
+    help = ("Time the deadline sweeper over many open attempts, most of them expired, "
+            "and report per-batch latency and peak Python memory.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--attempts', type=int, default=100_000)
+        parser.add_argument('--questions', type=int, default=10)
+        parser.add_argument('--expired', type=float, default=0.9, help="Share of attempts past their deadline.")
+        parser.add_argument('--autosaved', type=int, default=1000,
+                            help="Expired attempts with answers still in the autosave cache.")
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--trace-memory', action='store_true',
+                            help="Report peak Python memory of the sweep (tracemalloc slows it down).")
+
+    def handle(self, *args, **options):
+        with bench_database():
+            quiz = make_quiz(options['questions'], name='Sweeper benchmark')
+            students = make_students(options['attempts'], prefix='sweeper')
+            now = timezone.now()
+            rng = random.Random(0)
+            QuizAttempt.objects.bulk_create([
+                QuizAttempt(
+                    student=student, quiz=quiz,
+                    deadline=now + timedelta(minutes=rng.uniform(-120, -1) if rng.random() < options['expired']
+                                             else rng.uniform(1, 120)),
+                )
+                for student in students
+            ], batch_size=5000)
+            expired = QuizAttempt.objects.filter(completed=False, deadline__lt=now - timedelta(minutes=1)).count()
+
+            answers = {f'question_{question_id}': str(option_id) for question_id, option_id in
+                       Option.objects.filter(question__quiz=quiz, order=1).values_list('question_id', 'id')}
+            for attempt in QuizAttempt.objects.filter(deadline__lt=now).select_related('quiz')[:options['autosaved']]:
+                save_answers(attempt, answers)
+
+            self.stdout.write(f"{options['attempts']:,} open attempts, {expired:,} expired, "
+                              f"batches of {options['batch_size']}")
+            batches = []
+            if options['trace_memory']:
+                tracemalloc.start()
+            with measure() as total:
+                while True:
+                    start = time.perf_counter()
+                    if not submit_expired_attempts(options['batch_size']):
+                        break
+                    batches.append(time.perf_counter() - start)
+            if options['trace_memory']:
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+
+            swept = Result.objects.count()
+            self.stdout.write(f"swept {swept:,} attempts in {total['seconds']:.2f}s "
+                              f"({swept / total['seconds']:,.0f}/s), {total['queries']:,} queries")
+            self.stdout.write(f"batch ms: first {batches[0] * 1000:.1f}  p50 {percentile(batches, 50) * 1000:.1f}  "
+                              f"p95 {percentile(batches, 95) * 1000:.1f}  last {batches[-1] * 1000:.1f}")
+            if options['trace_memory']:
+                self.stdout.write(f"peak traced memory {peak / 1024 / 1024:.1f} MiB")
+            self.stdout.write(f"{QuizAttempt.objects.filter(completed=False).count():,} attempts still open")
@@ -0,0 +1,63 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from core.bench import bench_database, make_quiz, make_students, percentile
+from core.models import QuizAttempt
+
+
+class Command(BaseCommand):
+    help = "Benchmark take_quiz latency with and without the rendered paper cache."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--questions', type=int, default=100)
+        parser.add_argument('--clients', type=int, default=20)
+        parser.add_argument('--requests', type=int, default=20, help="Requests per client.")
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        try:
+            with bench_database(), override_settings(ALLOWED_HOSTS=['*']):
+                self.run(options)
+        finally:
+            teardown_test_environment()
+
+    def run(self, options):
+        quiz = make_quiz(options['questions'])
+        clients = []
+        for user in make_students(options['clients']):
+            QuizAttempt.objects.create(student=user, quiz=quiz)
+            client = Client()
+            client.force_login(user)
+            clients.append(client)
+        url = f'/quiz/{quiz.id}/'
+
+        def worker(client):
+            samples = []
+            for _ in range(options['requests']):
+                start = time.perf_counter()
+                response = client.get(url)
+                samples.append(time.perf_counter() - start)
+                assert response.status_code == 200, response.status_code
+            connection.close()
+            return samples
+
+        self.stdout.write(f"{options['clients']} clients x {options['requests']} requests, "
+                          f"{options['questions']} questions")
+        self.stdout.write(f"{'paper cache':>12} {'p50 ms':>8} {'p99 ms':>8} {'req/s':>8}")
+        for enabled in (False, True):
+            cache.clear()
+            with override_settings(QUIZ_PAPER_CACHE=enabled):
+                start = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=len(clients)) as pool:
+                    samples = [s for batch in pool.map(worker, clients) for s in batch]
+                elapsed = time.perf_counter() - start
+            self.stdout.write(
+                f"{'on' if enabled else 'off':>12} {percentile(samples, 50) * 1000:>8.1f} "
+                f"{percentile(samples, 99) * 1000:>8.1f} {len(samples) / elapsed:>8.1f}"
+            )
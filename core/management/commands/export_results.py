@@ -0,0 +1,30 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.export import CHUNK_SIZE, FORMATS, KINDS, export_lines
+from core.models import Quiz
+
+
+class Command(BaseCommand):
+    help = "Export a quiz's results or responses as CSV or JSONL."
+
+    def add_arguments(self, parser):
+        parser.add_argument('quiz_id', type=int)
+        parser.add_argument('--kind', choices=KINDS, default='results')
+        parser.add_argument('--format', choices=FORMATS, default='csv')
+        parser.add_argument('--output', help="File to write; defaults to stdout.")
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            quiz = Quiz.objects.get(id=options['quiz_id'])
+        except Quiz.DoesNotExist:
+            raise CommandError(f"Quiz {options['quiz_id']} does not exist.")
+
+        lines = export_lines(quiz, options['kind'], options['format'], options['chunk_size'])
+        if options['output']:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as out:
+                out.writelines(lines)
+        else:
+            sys.stdout.writelines(lines)
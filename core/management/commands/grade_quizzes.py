@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.dashboard import close_expired_quizzes
+from core.scoring import grade_quiz
+
+
+class Command(BaseCommand):
+    help = ("Score every completed attempt of the given quizzes in bulk. With --ended, "
+            "close the quizzes whose end time has passed, which grades them; run it "
+            "from cron after exams end.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('quiz_ids', nargs='*', type=int)
+        parser.add_argument('--ended', action='store_true', help="Close and grade every ended quiz.")
+
+    def handle(self, *args, **options):
+        if not options['quiz_ids'] and not options['ended']:
+            raise CommandError("Give quiz ids or --ended.")
+
+        if options['ended']:
+            start = time.perf_counter()
+            closed = close_expired_quizzes()
+            self.stdout.write(f"Closed and graded {len(closed)} ended quizzes in {time.perf_counter() - start:.2f}s")
+
+        for quiz_id in options['quiz_ids']:
+            start = time.perf_counter()
+            results = grade_quiz(quiz_id)
+            self.stdout.write(f"Quiz {quiz_id}: graded {len(results)} attempts in {time.perf_counter() - start:.2f}s")
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.importer import BATCH_SIZE, FORMATS, detect_format, import_questions
+from core.models import Quiz
+
+
+class Command(BaseCommand):
+    help = "Bulk import questions into a quiz from a CSV, JSON Lines or GIFT file."
+
+    def add_arguments(self, parser):
+        parser.add_argument('quiz_id', type=int)
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=FORMATS, help="Defaults to the file extension.")
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            quiz = Quiz.objects.get(id=options['quiz_id'])
+        except Quiz.DoesNotExist:
+            raise CommandError(f"Quiz {options['quiz_id']} does not exist.")
+
+        fmt = options['format'] or detect_format(options['path'])
+        with open(options['path'], 'rb') as lines:
+            report = import_questions(quiz, lines, fmt, options['batch_size'])
+
+        for line, error in report.errors:
+            self.stderr.write(f"Line {line}: {error}")
+        self.stdout.write(self.style.SUCCESS(str(report)))
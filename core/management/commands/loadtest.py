@@ -0,0 +1,167 @@
+import re
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from http.cookiejar import Cookie, CookieJar
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlencode, urlsplit
+from urllib.request import HTTPCookieProcessor, HTTPRedirectHandler, Request, build_opener
+
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+from django.utils import timezone
+
+from core.bench import make_quiz, percentile
+from core.models import Quiz
+
+RADIO_RE = re.compile(r'name="(question_\d+)"\s+id="[^"]*"\s+value="(\d+)"')
+PASSWORD = 'Load-test-pass-123'
+
+
+class NoRedirect(HTTPRedirectHandler):
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+class Browser:
+    """One student's cookie jar talking plain HTTP to the server."""
+
+    def __init__(self, base_url, timeout):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.jar = CookieJar()
+        self.opener = build_opener(HTTPCookieProcessor(self.jar), NoRedirect)
+
+    def set_cookie(self, name, value):
+        host = urlsplit(self.base_url).hostname
+        self.jar.set_cookie(Cookie(
+            0, name, value, None, False, host, False, False, '/', True,
+            False, None, False, None, None, {},
+        ))
+
+    def csrf_token(self):
+        for cookie in self.jar:
+            if cookie.name == 'csrftoken':
+                return cookie.value
+        return ''
+
+    def request(self, path, data=None):
+        url = self.base_url + path
+        body = None
+        headers = {}
+        if data is not None:
+            data = dict(data, csrfmiddlewaretoken=self.csrf_token())
+            body = urlencode(data, doseq=True).encode()
+            headers['Referer'] = url
+        try:
+            with self.opener.open(Request(url, data=body, headers=headers), timeout=self.timeout) as response:
+                return response.status, response.read().decode()
+        except HTTPError as exc:
+            return exc.code, exc.read().decode(errors='replace')
+
+
+class Command(BaseCommand):
+    help = ("Drive the student exam flow over HTTP against a running server "
+            "(runserver or gunicorn) and report latency percentiles per step.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+        parser.add_argument('--students', type=int, default=50)
+        parser.add_argument('--concurrency', type=int, default=10)
+        parser.add_argument('--quiz', type=int, help="Quiz id to sit; a fresh open quiz is created if omitted.")
+        parser.add_argument('--questions', type=int, default=20)
+        parser.add_argument('--timeout', type=float, default=30.0)
+
+    def handle(self, *args, **options):
+        quiz = self.get_quiz(options)
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.timeout = options['timeout']
+        self.base_url = options['base_url']
+        self.quiz_id = quiz.id
+
+        prefix = f'load_{uuid.uuid4().hex[:8]}'
+        usernames = [f'{prefix}_{i}' for i in range(options['students'])]
+
+        self.stdout.write(f"Registering {len(usernames)} students...")
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            list(pool.map(self.register, usernames))
+            register_wall = time.perf_counter() - started
+
+            self.stdout.write(f"Running the exam flow on quiz {quiz.id}...")
+            started = time.perf_counter()
+            list(pool.map(self.sit_exam, usernames))
+            exam_wall = time.perf_counter() - started
+
+        self.report({'register': register_wall}, exam_wall)
+
+    def get_quiz(self, options):
+        if options['quiz']:
+            try:
+                return Quiz.objects.get(id=options['quiz'])
+            except Quiz.DoesNotExist:
+                raise CommandError(f"Quiz {options['quiz']} does not exist.")
+        quiz = make_quiz(options['questions'], name='Load test quiz')
+        current = timezone.now()
+        quiz.start_time = current - timedelta(minutes=1)
+        quiz.end_time = current + timedelta(hours=1)
+        quiz.save()
+        return quiz
+
+    def step(self, name, browser, path, data=None, expect=(200, 302)):
+        start = time.perf_counter()
+        try:
+            status, body = browser.request(path, data)
+        except (URLError, OSError):
+            status, body = None, ''
+        self.samples[name].append(time.perf_counter() - start)
+        if status not in expect:
+            self.errors[name] += 1
+            return None
+        return body
+
+    def register(self, username):
+        browser = Browser(self.base_url, self.timeout)
+        browser.request(reverse('student_register'))
+        self.step('register', browser, reverse('student_register'), {
+            'username': username,
+            'email': f'{username}@example.com',
+            'password': PASSWORD,
+            'confirm_password': PASSWORD,
+        }, expect=(302,))
+
+    def sit_exam(self, username):
+        browser = Browser(self.base_url, self.timeout)
+        browser.request(reverse('student_login'))
+        if self.step('login', browser, reverse('student_login'),
+                     {'username': username, 'password': PASSWORD}, expect=(302,)) is None:
+            return
+        self.step('dashboard', browser, reverse('student_dashboard'), expect=(200,))
+        paper = self.step('take_quiz', browser, reverse('take_quiz', args=[self.quiz_id]), expect=(200,))
+        if paper is None:
+            return
+        answers = {}
+        for name, value in RADIO_RE.findall(paper):
+            answers.setdefault(name, value)
+        self.step('submit_quiz', browser, reverse('submit_quiz', args=[self.quiz_id]), answers, expect=(302,))
+        self.step('quiz_result', browser, reverse('quiz_result', args=[self.quiz_id]), expect=(200,))
+
+    def report(self, phase_walls, exam_wall):
+        self.stdout.write(
+            f"{'step':<12} {'count':>6} {'errors':>6} {'req/s':>8} "
+            f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}"
+        )
+        for name, samples in self.samples.items():
+            wall = phase_walls.get(name, exam_wall)
+            self.stdout.write(
+                f"{name:<12} {len(samples):>6} {self.errors[name]:>6} {len(samples) / wall:>8.1f} "
+                f"{percentile(samples, 50) * 1000:>8.1f} {percentile(samples, 95) * 1000:>8.1f} "
+                f"{percentile(samples, 99) * 1000:>8.1f} {max(samples) * 1000:>8.1f}"
+            )
+        flows = len(self.samples.get('quiz_result', []))
+        self.stdout.write(self.style.SUCCESS(
+            f"{flows} complete exam flows in {exam_wall:.2f}s ({flows / exam_wall:.1f} students/s)"
+        ))
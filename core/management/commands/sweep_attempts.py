@@ -0,0 +1,49 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError
+
+from core.answer_key import cache_is_shared
+from core.submission import submit_expired_attempts
+
+
+class Command(BaseCommand):
+    help = ("Submit and score the open attempts whose deadline has passed, with the "
+            "answers autosaved in time. Sweeps once, or keeps polling with --loop.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--loop', action='store_true', help="Keep polling for expired attempts.")
+        parser.add_argument('--interval', type=float, default=10.0,
+                            help="Seconds to sleep when nothing has expired.")
+
+    def handle(self, *args, **options):
+        if not cache_is_shared('state'):
+            raise CommandError(
+                "The state cache is local memory, so the answers autosaved by the web "
+                "workers are not visible here and would be dropped. Set CACHE_BACKEND to "
+                "'file' or 'redis'."
+            )
+
+        while True:
+            swept = 0
+            start = time.perf_counter()
+            while True:
+                try:
+                    count = submit_expired_attempts(options['batch_size'])
+                except OperationalError as exc:
+                    if not options['loop']:
+                        raise
+                    self.stderr.write(f"Sweep batch failed, retrying: {exc}")
+                    time.sleep(options['interval'])
+                    continue
+                if not count:
+                    break
+                swept += count
+            if swept:
+                seconds = time.perf_counter() - start
+                self.stdout.write(f"Submitted {swept} expired attempts in {seconds:.2f}s "
+                                  f"({swept / seconds:,.0f}/s)")
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
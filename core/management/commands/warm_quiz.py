@@ -0,0 +1,65 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.answer_key import cache_is_shared
+from core.models import Quiz
+from core.warmup import warm_quiz
+
+
+class Command(BaseCommand):
+    help = ("Warm the caches a quiz sitting needs. Pass quiz ids, or use "
+            "--lead-minutes to warm every quiz starting within that window.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('quiz_ids', nargs='*', type=int)
+        parser.add_argument('--lead-minutes', type=int,
+                            help="Warm active quizzes whose start_time is within this many minutes.")
+        parser.add_argument('--loop', action='store_true',
+                            help="With --lead-minutes, keep running and check every --interval seconds.")
+        parser.add_argument('--interval', type=int, default=60)
+
+    def handle(self, *args, **options):
+        if not cache_is_shared():
+            raise CommandError(
+                "The default cache is local memory, so the web workers would not see "
+                "anything warmed here. Set CACHE_BACKEND to 'file' or 'redis'."
+            )
+
+        if options['quiz_ids']:
+            for quiz_id in options['quiz_ids']:
+                try:
+                    quiz = Quiz.objects.get(id=quiz_id)
+                except Quiz.DoesNotExist:
+                    raise CommandError(f"Quiz {quiz_id} does not exist.")
+                self.warm(quiz)
+            return
+
+        if options['lead_minutes'] is None:
+            raise CommandError("Pass quiz ids or --lead-minutes.")
+
+        warmed = set()
+        while True:
+            current = timezone.now()
+            upcoming = Quiz.objects.filter(
+                active=True,
+                start_time__gt=current,
+                start_time__lte=current + timedelta(minutes=options['lead_minutes']),
+            )
+            for quiz in upcoming:
+                if (quiz.id, quiz.updated_at) not in warmed:
+                    self.warm(quiz)
+                    warmed.add((quiz.id, quiz.updated_at))
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+    def warm(self, quiz):
+        timings = warm_quiz(quiz)
+        self.stdout.write(f"Warmed quiz {quiz.id} ({quiz.name}), starts {quiz.start_time}:")
+        for stage, seconds in timings:
+            self.stdout.write(f"  {stage:<12} {seconds * 1000:8.1f} ms")
+        total = sum(seconds for _, seconds in timings)
+        self.stdout.write(self.style.SUCCESS(f"  {'total':<12} {total * 1000:8.1f} ms"))
@@ -0,0 +1,77 @@
+import threading
+from collections import defaultdict
+
+# Upper bounds of the request latency histogram, in seconds.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class ViewStats:
+    __slots__ = ('requests', 'seconds', 'queries', 'sql_seconds', 'template_seconds', 'buckets')
+
+    def __init__(self):
+        self.requests = 0
+        self.seconds = 0.0
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.template_seconds = 0.0
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+
+
+class MetricsRegistry:
+    """Per-process totals by view name.
+
+    Each gunicorn worker keeps its own registry, so ``/metrics`` reports the
+    worker that served the scrape.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.views = defaultdict(ViewStats)
+
+    def record(self, view, seconds, queries, sql_seconds, template_seconds):
+        with self.lock:
+            stats = self.views[view]
+            stats.requests += 1
+            stats.seconds += seconds
+            stats.queries += queries
+            stats.sql_seconds += sql_seconds
+            stats.template_seconds += template_seconds
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    stats.buckets[i] += 1
+
+    def reset(self):
+        with self.lock:
+            self.views.clear()
+
+    def render(self):
+        """Prometheus text exposition format."""
+        with self.lock:
+            views = sorted(self.views.items())
+            lines = []
+
+            def family(name, kind, help_text, value_of):
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} {kind}')
+                for view, stats in views:
+                    lines.append(f'{name}{{view="{view}"}} {value_of(stats)}')
+
+            family('quiz_requests_total', 'counter', 'Requests served.', lambda s: s.requests)
+            family('quiz_sql_queries_total', 'counter', 'SQL queries executed.', lambda s: s.queries)
+            family('quiz_sql_seconds_total', 'counter', 'Time spent in SQL.', lambda s: s.sql_seconds)
+            family('quiz_template_seconds_total', 'counter', 'Time spent rendering templates.',
+                   lambda s: s.template_seconds)
+
+            name = 'quiz_request_duration_seconds'
+            lines.append(f'# HELP {name} Total request latency.')
+            lines.append(f'# TYPE {name} histogram')
+            for view, stats in views:
+                for bound, count in zip(LATENCY_BUCKETS, stats.buckets):
+                    lines.append(f'{name}_bucket{{view="{view}",le="{bound}"}} {count}')
+                lines.append(f'{name}_bucket{{view="{view}",le="+Inf"}} {stats.requests}')
+                lines.append(f'{name}_sum{{view="{view}"}} {stats.seconds}')
+                lines.append(f'{name}_count{{view="{view}"}} {stats.requests}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
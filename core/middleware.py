@@ -0,0 +1,104 @@
+import logging
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.template.backends.django import Template
+
+from .metrics import registry
+
+logger = logging.getLogger('core.metrics')
+
+_current = ContextVar('quiz_request_metrics', default=None)
+_template_render = Template.render
+
+
+def _timed_template_render(self, *args, **kwargs):
+    metrics = _current.get()
+    if metrics is None:
+        return _template_render(self, *args, **kwargs)
+    start = time.perf_counter()
+    try:
+        return _template_render(self, *args, **kwargs)
+    finally:
+        metrics['template_seconds'] += time.perf_counter() - start
+
+
+class RequestMetricsMiddleware:
+    """Record query count, SQL time, template time and latency per view.
+
+    Enabled with ``QUIZ_METRICS``; when it is off Django drops the middleware
+    at startup, so disabled metrics cost nothing per request.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'QUIZ_METRICS', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        slow_ms = getattr(settings, 'QUIZ_METRICS_SLOW_QUERY_MS', None)
+        self.slow_seconds = slow_ms / 1000 if slow_ms is not None else None
+        Template.render = _timed_template_render
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+            # Async views query from worker threads with their own
+            # connections, so every connection gets the timer up front.
+            connection_created.connect(self.install_timer, weak=False)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics = {'queries': 0, 'sql_seconds': 0.0, 'template_seconds': 0.0, 'slow': []}
+        token = _current.set(metrics)
+        start = time.perf_counter()
+        try:
+            with connection.execute_wrapper(self.time_query):
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.record(request, metrics, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        # The contextvar follows the request into the ORM's worker threads.
+        metrics = {'queries': 0, 'sql_seconds': 0.0, 'template_seconds': 0.0, 'slow': []}
+        token = _current.set(metrics)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.record(request, metrics, time.perf_counter() - start)
+        return response
+
+    def record(self, request, metrics, seconds):
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else 'unresolved'
+        registry.record(view, seconds, metrics['queries'], metrics['sql_seconds'],
+                        metrics['template_seconds'])
+        for duration, sql in metrics['slow']:
+            logger.warning("Slow query in %s (%.1f ms): %s", view, duration * 1000, sql)
+
+    def install_timer(self, sender, connection, **kwargs):
+        if self.time_query not in connection.execute_wrappers:
+            connection.execute_wrappers.append(self.time_query)
+
+    def time_query(self, execute, sql, params, many, context):
+        metrics = _current.get()
+        if metrics is None:
+            return execute(sql, params, many, context)
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            metrics['queries'] += 1
+            metrics['sql_seconds'] += duration
+            if self.slow_seconds is not None and duration >= self.slow_seconds:
+                metrics['slow'].append((duration, sql))
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:39
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_total_questions(apps, schema_editor):
+    Question = apps.get_model('core', 'Question')
+    Result = apps.get_model('core', 'Result')
+    db_alias = schema_editor.connection.alias
+
+    # Results scored before this field existed; backfill_results only
+    # scores attempts that have no Result at all.
+    questions = (
+        Question.objects.using(db_alias).filter(quiz=OuterRef('quiz')).order_by()
+        .values('quiz').annotate(count=Count('id')).values('count')
+    )
+    count = Result.objects.using(db_alias).filter(quiz__isnull=False).update(
+        total_questions=Coalesce(Subquery(questions), 0),
+    )
+    if count:
+        print(f"  Set total_questions on {count} existing results.")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0024_alter_quizattempt_completed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='result',
+            name='total_questions',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_total_questions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:43
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def remove_duplicate_responses(apps, schema_editor):
+    # Keep only the latest response for each (attempt, question) pair so the
+    # unique constraint below can be created.
+    Response = apps.get_model('core', 'Response')
+    db_alias = schema_editor.connection.alias
+
+    keep_ids = (
+        Response.objects.using(db_alias)
+        .filter(attempt__isnull=False, question__isnull=False)
+        .values('attempt', 'question')
+        .annotate(keep_id=Max('id'))
+        .values('keep_id')
+    )
+    deleted, _ = (
+        Response.objects.using(db_alias)
+        .filter(attempt__isnull=False, question__isnull=False)
+        .exclude(id__in=keep_ids)
+        .delete()
+    )
+    if deleted:
+        print(f"  Removed {deleted} duplicate responses.")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0025_result_total_questions'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='quiz',
+            index=models.Index(fields=['end_time', 'start_time', 'active'], name='quiz_window_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='quizattempt',
+            index=models.Index(fields=['student', 'quiz', 'completed'], name='attempt_student_quiz_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='result',
+            index=models.Index(fields=['quiz', '-score'], name='result_quiz_score_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='result',
+            index=models.Index(fields=['student', 'quiz'], name='result_student_quiz_idx'),
+        ),
+        migrations.RunPython(remove_duplicate_responses, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='response',
+            constraint=models.UniqueConstraint(fields=('attempt', 'question'), name='unique_response_per_question'),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:48
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def populate_statuses(apps, schema_editor):
+    QuizAttempt = apps.get_model('core', 'QuizAttempt')
+    Result = apps.get_model('core', 'Result')
+    StudentQuizStatus = apps.get_model('core', 'StudentQuizStatus')
+    db_alias = schema_editor.connection.alias
+
+    statuses = {}
+    for attempt in (
+        QuizAttempt.objects.using(db_alias)
+        .filter(student__isnull=False, quiz__isnull=False, completed=False)
+        .only('student_id', 'quiz_id').iterator()
+    ):
+        statuses[attempt.student_id, attempt.quiz_id] = StudentQuizStatus(
+            student_id=attempt.student_id, quiz_id=attempt.quiz_id, status='in_progress',
+        )
+    for result in (
+        Result.objects.using(db_alias)
+        .filter(student__isnull=False, quiz__isnull=False)
+        .order_by('id').iterator()
+    ):
+        statuses[result.student_id, result.quiz_id] = StudentQuizStatus(
+            student_id=result.student_id, quiz_id=result.quiz_id, status='submitted',
+            score=result.score, total_questions=result.total_questions,
+        )
+    StudentQuizStatus.objects.using(db_alias).bulk_create(statuses.values(), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0026_hot_lookup_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentQuizStatus',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('in_progress', 'In progress'), ('submitted', 'Submitted')], default='in_progress', max_length=20)),
+                ('score', models.IntegerField(default=0)),
+                ('total_questions', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('quiz', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='student_statuses', to='core.quiz')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='quiz_statuses', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('student', 'quiz'), name='unique_status_per_student_quiz')],
+            },
+        ),
+        migrations.RunPython(populate_statuses, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0027_student_quiz_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quiz',
+            name='questions_per_attempt',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='quiz',
+            name='shuffle_options',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='quiz',
+            name='shuffle_questions',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='quizattempt',
+            name='seed',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+    ]
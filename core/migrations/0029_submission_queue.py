@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0028_question_pool'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingSubmission',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('answers', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('attempt', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='pending_submission', to='core.quizattempt')),
+            ],
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:50
+
+from django.conf import settings
+from datetime import timedelta
+
+from django.db import migrations, models
+from django.db.models import F
+from django.db.models.functions import Least
+
+
+def backfill_deadlines(apps, schema_editor):
+    Quiz = apps.get_model('core', 'Quiz')
+    QuizAttempt = apps.get_model('core', 'QuizAttempt')
+    db_alias = schema_editor.connection.alias
+
+    count = 0
+    quiz_ids = QuizAttempt.objects.using(db_alias).filter(completed=False).values('quiz_id')
+    for quiz in Quiz.objects.using(db_alias).filter(id__in=quiz_ids).iterator():
+        if quiz.duration:
+            deadline = F('started_at') + timedelta(minutes=quiz.duration)
+            if quiz.end_time:
+                deadline = Least(deadline, quiz.end_time)
+        else:
+            deadline = quiz.end_time
+        count += QuizAttempt.objects.using(db_alias).filter(quiz=quiz, completed=False).update(deadline=deadline)
+    if count:
+        print(f"  Set the deadline of {count} open attempts.")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0029_submission_queue'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quizattempt',
+            name='deadline',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='quizattempt',
+            index=models.Index(condition=models.Q(('completed', False)), fields=['deadline'], name='attempt_open_deadline_idx'),
+        ),
+        migrations.RunPython(backfill_deadlines, migrations.RunPython.noop),
+    ]
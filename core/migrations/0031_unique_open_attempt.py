@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:58
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def remove_duplicate_open_attempts(apps, schema_editor):
+    QuizAttempt = apps.get_model('core', 'QuizAttempt')
+    db_alias = schema_editor.connection.alias
+
+    # The views always used the lowest id (``.first()``); the others were
+    # left behind by racing requests and never received answers from them.
+    deleted = 0
+    duplicates = (
+        QuizAttempt.objects.using(db_alias)
+        .filter(completed=False, student__isnull=False, quiz__isnull=False)
+        .values('student_id', 'quiz_id')
+        .annotate(count=Count('id'), keep=Min('id'))
+        .filter(count__gt=1)
+    )
+    for row in duplicates:
+        deleted += QuizAttempt.objects.using(db_alias).filter(
+            student_id=row['student_id'], quiz_id=row['quiz_id'], completed=False,
+        ).exclude(id=row['keep']).delete()[1].get('core.QuizAttempt', 0)
+    if deleted:
+        print(f"  Removed {deleted} duplicate open attempts.")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0030_attempt_deadline'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_open_attempts, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='quizattempt',
+            constraint=models.UniqueConstraint(condition=models.Q(('completed', False)), fields=('student', 'quiz'), name='unique_open_attempt'),
+        ),
+    ]
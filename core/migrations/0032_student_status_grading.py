@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:44
+
+from django.db import migrations, models
+
+
+def mark_queued_grading(apps, schema_editor):
+    PendingSubmission = apps.get_model('core', 'PendingSubmission')
+    StudentQuizStatus = apps.get_model('core', 'StudentQuizStatus')
+    db_alias = schema_editor.connection.alias
+
+    count = 0
+    for student_id, quiz_id in (
+        PendingSubmission.objects.using(db_alias)
+        .values_list('attempt__student_id', 'attempt__quiz_id').iterator()
+    ):
+        count += StudentQuizStatus.objects.using(db_alias).filter(
+            student_id=student_id, quiz_id=quiz_id, status='in_progress',
+        ).update(status='grading')
+    if count:
+        print(f"  Marked {count} queued submissions as grading.")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0031_unique_open_attempt'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='studentquizstatus',
+            name='status',
+            field=models.CharField(choices=[('in_progress', 'In progress'), ('grading', 'Grading'), ('submitted', 'Submitted')], default='in_progress', max_length=20),
+        ),
+        migrations.RunPython(mark_queued_grading, migrations.RunPython.noop),
+    ]
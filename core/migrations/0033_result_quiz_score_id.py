@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:07
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0032_student_status_grading'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='result',
+            name='result_quiz_score_idx',
+        ),
+        migrations.AddIndex(
+            model_name='result',
+            index=models.Index(fields=['quiz', '-score', 'id'], name='result_quiz_score_idx'),
+        ),
+    ]
@@ -22,12 +22,24 @@ class Quiz(models.Model):
     end_time = models.DateTimeField(default=timezone.now, null=True, blank=True)
     active = models.BooleanField(default=True)
     duration = models.IntegerField(default=30)  # Duration in minutes
+    questions_per_attempt = models.PositiveIntegerField(null=True, blank=True)  # Draw K of the pool; blank = all
+    shuffle_questions = models.BooleanField(default=False)
+    shuffle_options = models.BooleanField(default=False)
     created_at = models.DateTimeField(default=timezone.now, null=True, blank=True)
     updated_at = models.DateTimeField(auto_now=True, null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['end_time', 'start_time', 'active'], name='quiz_window_idx'),
+        ]
+
     def __str__(self):
         return self.name
 
+    @property
+    def is_randomized(self):
+        return bool(self.questions_per_attempt or self.shuffle_questions or self.shuffle_options)
+
 class Question(models.Model):
     quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name='questions', null=True, blank=True)
     text = models.TextField(null=True, blank=True)
@@ -49,6 +61,21 @@ class QuizAttempt(models.Model):
     quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, null=True, blank=True)
     completed = models.BooleanField(default=False)
     started_at = models.DateTimeField(default=timezone.now, null=True, blank=True)
+    seed = models.IntegerField(null=True, blank=True)  # Regenerates a randomized paper
+    deadline = models.DateTimeField(null=True, blank=True)  # started_at + duration, capped at quiz.end_time
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['student', 'quiz', 'completed'], name='attempt_student_quiz_idx'),
+            # Only open attempts can expire; the sweeper walks this in deadline order.
+            models.Index(fields=['deadline'], condition=models.Q(completed=False), name='attempt_open_deadline_idx'),
+        ]
+        constraints = [
+            # At most one attempt in progress per student and quiz.
+            models.UniqueConstraint(
+                fields=['student', 'quiz'], condition=models.Q(completed=False), name='unique_open_attempt',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.student.username} - {self.quiz.name}"
@@ -58,6 +85,11 @@ class Response(models.Model):
     question = models.ForeignKey(Question, on_delete=models.CASCADE,null=True, blank=True)
     selected_option = models.ForeignKey(Option, on_delete=models.CASCADE,null=True, blank=True)
     student = models.ForeignKey(Student, on_delete=models.CASCADE,null=True, blank=True)  # Ensure this line exists and is correct
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['attempt', 'question'], name='unique_response_per_question'),
+        ]
     
     def __str__(self):
         return f"Response by {self.student} for {self.question.text}"
@@ -67,8 +99,50 @@ class Result(models.Model):
     quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, null=True, blank=True)
     student = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
     score = models.IntegerField(default=0)
+    total_questions = models.IntegerField(default=0)
     total_attempted = models.IntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True, null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['quiz', '-score', 'id'], name='result_quiz_score_idx'),
+            models.Index(fields=['student', 'quiz'], name='result_student_quiz_idx'),
+        ]
+
     def __str__(self):
         return f"{self.student.username} - {self.quiz.name}: {self.score}/{self.total_attempted}"
+
+class StudentQuizStatus(models.Model):
+    """Denormalized dashboard row: where a student stands on one quiz."""
+    IN_PROGRESS = 'in_progress'
+    GRADING = 'grading'  # Submitted and queued for the grading worker
+    SUBMITTED = 'submitted'
+    STATUS_CHOICES = [
+        (IN_PROGRESS, 'In progress'),
+        (GRADING, 'Grading'),
+        (SUBMITTED, 'Submitted'),
+    ]
+
+    student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='quiz_statuses')
+    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name='student_statuses')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=IN_PROGRESS)
+    score = models.IntegerField(default=0)
+    total_questions = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['student', 'quiz'], name='unique_status_per_student_quiz'),
+        ]
+
+    def __str__(self):
+        return f"{self.student.username} - {self.quiz.name}: {self.get_status_display()}"
+
+class PendingSubmission(models.Model):
+    """A submitted attempt waiting for the grading worker (QUIZ_SUBMIT_QUEUE)."""
+    attempt = models.OneToOneField(QuizAttempt, on_delete=models.CASCADE, related_name='pending_submission')
+    answers = models.JSONField(default=dict)  # question id -> selected option id
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Pending submission of attempt {self.attempt_id}"
@@ -0,0 +1,118 @@
+import functools
+import itertools
+import random
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+
+from .answer_key import CACHE_TIMEOUT, content_version
+from .models import Question
+
+# Up to this many options a shuffle picks one of the precomputed orderings.
+MAX_PERMUTED_OPTIONS = 6
+
+
+def _paper_key(quiz):
+    updated = quiz.updated_at.timestamp() if quiz.updated_at else 0
+    return f'quiz_paper:{quiz.id}:{updated}:{content_version(quiz.id)}'
+
+
+def build_paper(quiz):
+    """Serialize a quiz's questions and options and render the question block."""
+    questions = []
+    for question in Question.objects.filter(quiz=quiz).prefetch_related('options_set').order_by('id'):
+        questions.append({
+            'id': question.id,
+            'text': question.text,
+            'options': [
+                {'id': option.id, 'text': option.option_text}
+                for option in sorted(question.options_set.all(), key=lambda o: (o.order, o.id))
+            ],
+        })
+    html = render_to_string('core/quiz_paper.html', {'questions': questions})
+    return {'questions': questions, 'html': html}
+
+
+def get_paper(quiz, refresh=False):
+    """Return the paper every student of a quiz sees, rendered at most once
+    per quiz version."""
+    if not getattr(settings, 'QUIZ_PAPER_CACHE', True):
+        return build_paper(quiz)
+
+    key = _paper_key(quiz)
+    paper = None if refresh else cache.get(key)
+    if paper is None:
+        paper = build_paper(quiz)
+        cache.set(key, paper, CACHE_TIMEOUT)
+    return paper
+
+
+def generate_paper(questions, seed, draw=None, shuffle_questions=False, shuffle_options=False):
+    """Deterministically pick and order one attempt's questions.
+
+    ``questions`` is the serialized pool of a cached paper, so positions
+    into it act as the pool index: drawing K of N costs O(K) and the same
+    seed always yields the same paper.
+    """
+    rng = random.Random(seed)
+    size = len(questions)
+    if draw and draw < size:
+        indices = rng.sample(range(size), draw)
+        if not shuffle_questions:
+            indices.sort()
+    elif shuffle_questions:
+        indices = list(range(size))
+        rng.shuffle(indices)
+    else:
+        indices = range(size)
+
+    if not shuffle_options:
+        return [questions[index] for index in indices]
+
+    paper = []
+    random_float = rng.random
+    for index in indices:
+        question = questions[index]
+        options = question['options']
+        if len(options) <= MAX_PERMUTED_OPTIONS:
+            orders = _option_orders(len(options))
+            order = orders[int(random_float() * len(orders))]
+        else:
+            order = rng.sample(range(len(options)), len(options))
+        paper.append({
+            'id': question['id'],
+            'text': question['text'],
+            'options': [options[i] for i in order],
+        })
+    return paper
+
+
+@functools.lru_cache(maxsize=None)
+def _option_orders(count):
+    """Every ordering of ``count`` options; picking one is a single draw."""
+    return tuple(itertools.permutations(range(count)))
+
+
+def new_seed():
+    return random.getrandbits(31)
+
+
+def attempt_questions(quiz, attempt):
+    """Regenerate the questions of a randomized attempt from its seed."""
+    seed = attempt.seed if attempt.seed is not None else attempt.id
+    return generate_paper(
+        get_paper(quiz)['questions'], seed,
+        draw=quiz.questions_per_attempt,
+        shuffle_questions=quiz.shuffle_questions,
+        shuffle_options=quiz.shuffle_options,
+    )
+
+
+def attempt_paper(quiz, attempt):
+    """The paper one attempt sees: the shared cached paper, or its own draw
+    from the pool when the quiz is randomized."""
+    if not quiz.is_randomized:
+        return get_paper(quiz)
+    questions = attempt_questions(quiz, attempt)
+    return {'questions': questions, 'html': render_to_string('core/quiz_paper.html', {'questions': questions})}
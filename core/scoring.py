@@ -0,0 +1,147 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from .answer_key import aget_answer_key, get_answer_key, invalidate_quiz_content, score_answers
+from .dashboard import amark_submitted, mark_submitted, refresh_submitted_scores
+from .models import QuizAttempt, Response, Result
+
+
+def _result_fields(attempt, key, option_ids):
+    return {
+        'quiz_id': attempt.quiz_id,
+        'student_id': attempt.student_id,
+        'score': score_answers(key, option_ids),
+        'total_questions': key.total_questions,
+        'total_attempted': len(option_ids),
+    }
+
+
+def score_attempt(attempt, option_ids=None):
+    """Score a completed attempt once and persist it as its ``Result``.
+
+    ``option_ids`` are the selected options when the caller already has
+    them (e.g. at submit time); otherwise they are read from ``Response``.
+    Correctness comes from the quiz's answer key, never from ``Option``.
+    """
+    if option_ids is None:
+        option_ids = list(
+            Response.objects.filter(attempt=attempt).values_list('selected_option_id', flat=True)
+        )
+    key = get_answer_key(attempt.quiz_id)
+
+    result, _ = Result.objects.update_or_create(
+        attempt=attempt, defaults=_result_fields(attempt, key, option_ids)
+    )
+    mark_submitted([result])
+    return result
+
+
+async def ascore_attempt(attempt, option_ids=None):
+    """Async ``score_attempt`` for the ASGI views."""
+    if option_ids is None:
+        option_ids = [
+            option_id async for option_id in
+            Response.objects.filter(attempt=attempt).values_list('selected_option_id', flat=True)
+        ]
+    key = await aget_answer_key(attempt.quiz_id)
+
+    result, _ = await Result.objects.aupdate_or_create(
+        attempt=attempt, defaults=_result_fields(attempt, key, option_ids)
+    )
+    await amark_submitted([result])
+    return result
+
+
+def score_attempts(attempts):
+    """Create ``Result`` rows for a batch of completed attempts.
+
+    Reads the selected options of the whole batch with one query and
+    scores them against the cached answer keys.
+    """
+    attempts = list(attempts)
+    if not attempts:
+        return []
+
+    selected = defaultdict(list)
+    for attempt_id, option_id in (
+        Response.objects.filter(attempt__in=attempts).values_list('attempt_id', 'selected_option_id')
+    ):
+        selected[attempt_id].append(option_id)
+
+    results = []
+    for attempt in attempts:
+        key = get_answer_key(attempt.quiz_id)
+        option_ids = selected.get(attempt.id, [])
+        results.append(Result(attempt=attempt, **_result_fields(attempt, key, option_ids)))
+    results = Result.objects.bulk_create(results)
+    mark_submitted(results)
+    return results
+
+
+def rescore_quiz(quiz_id):
+    """Re-score every completed attempt of a quiz, e.g. after its answer key
+    was fixed; returns the number of results written.
+
+    Existing results are updated by one UPDATE whose subquery counts each
+    attempt's correct responses in SQL, and the dashboard rows follow in a
+    second one. Completed attempts that were never scored (and are not
+    waiting for the grading worker) get their ``Result`` from
+    ``score_attempts``.
+    """
+    # Option.is_correct may have been changed with update(), which skips
+    # the signals that normally drop the cached answer key.
+    invalidate_quiz_content(quiz_id)
+    key = get_answer_key(quiz_id)
+    correct = (
+        Response.objects.filter(attempt=OuterRef('attempt'), selected_option__is_correct=True)
+        .order_by().values('attempt').annotate(count=Count('id')).values('count')
+    )
+    with transaction.atomic():
+        updated = Result.objects.filter(quiz_id=quiz_id).update(
+            score=Coalesce(Subquery(correct), 0),
+            total_questions=key.total_questions,
+        )
+        created = score_attempts(
+            QuizAttempt.objects.filter(
+                quiz_id=quiz_id, completed=True, result__isnull=True, pending_submission__isnull=True
+            )
+        )
+        refresh_submitted_scores(quiz_id, key.total_questions)
+    return updated + len(created)
+
+
+def grade_quiz(quiz_id):
+    """Score every completed attempt of a quiz at once; returns the results.
+
+    One query groups the attempts' responses joined to ``Option.is_correct``
+    and one upsert writes all ``Result`` rows, replacing earlier scores.
+    Attempts still queued for the grading worker are left to it.
+    """
+    key = get_answer_key(quiz_id)
+    rows = (
+        QuizAttempt.objects.filter(quiz_id=quiz_id, completed=True, pending_submission__isnull=True)
+        .values_list('id', 'student_id')
+        .annotate(
+            attempted=Count('response'),
+            correct=Count('response', filter=Q(response__selected_option__is_correct=True)),
+        )
+        .order_by()
+    )
+    results = [
+        Result(attempt_id=attempt_id, quiz_id=quiz_id, student_id=student_id, score=correct,
+               total_questions=key.total_questions, total_attempted=attempted)
+        for attempt_id, student_id, attempted, correct in rows
+    ]
+    if not results:
+        return []
+    results = Result.objects.bulk_create(
+        results,
+        update_conflicts=True,
+        unique_fields=['attempt'],
+        update_fields=['quiz', 'student', 'score', 'total_questions', 'total_attempted'],
+    )
+    mark_submitted(results)
+    return results
@@ -0,0 +1,41 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .answer_key import invalidate_quiz_content
+from .dashboard import invalidate_quiz_schedule, quiz_closed
+from .deadlines import reset_deadlines
+from .models import Option, Question, Quiz
+from .scoring import grade_quiz
+
+
+@receiver([post_save, post_delete], sender=Quiz)
+def quiz_changed(sender, instance, **kwargs):
+    invalidate_quiz_schedule()
+    invalidate_quiz_content(instance.id)
+
+
+@receiver(post_save, sender=Quiz)
+def quiz_saved(sender, instance, created, **kwargs):
+    # The duration or end time may have moved the open attempts' deadlines.
+    if not created:
+        reset_deadlines(instance)
+
+
+@receiver([post_save, post_delete], sender=Question)
+def question_changed(sender, instance, **kwargs):
+    invalidate_quiz_content(instance.quiz_id)
+
+
+@receiver([post_save, post_delete], sender=Option)
+def option_changed(sender, instance, **kwargs):
+    if instance.question_id is None:
+        return
+    quiz_id = Question.objects.filter(pk=instance.question_id).values_list('quiz_id', flat=True).first()
+    invalidate_quiz_content(quiz_id)
+
+
+@receiver(quiz_closed)
+def grade_closed_quizzes(sender, quiz_ids, **kwargs):
+    # Past the deadline every submission is in: grade each quiz in bulk.
+    for quiz_id in quiz_ids:
+        grade_quiz(quiz_id)
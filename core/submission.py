@@ -0,0 +1,258 @@
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.backends.redis import RedisCache
+from django.db import transaction
+from django.http import Http404
+from django.utils import timezone
+from django.utils.connection import ConnectionProxy
+
+from .answer_key import aget_answer_key, get_answer_key
+from .deadlines import deadline_passed, grace
+from .models import QuizAttempt, Response
+from .paper import attempt_questions
+from .scoring import score_attempt, score_attempts
+from .submission_queue import enqueue_submission
+
+AUTOSAVE_TIMEOUT = 60 * 60 * 6
+# A save holds its attempt's sheet this long at most; a crashed holder's
+# lock expires after it.
+LOCK_TIMEOUT = 5
+
+# Autosaved answers not yet in the database; this cache never culls them.
+autosaves = ConnectionProxy(caches, 'state')
+
+
+def _sheet_key(attempt_id):
+    """An attempt's autosaved answers and the time of their last flush."""
+    return f'autosave:{attempt_id}'
+
+
+def _lock_key(attempt_id):
+    return f'autosave:{attempt_id}:lock'
+
+
+def flush_interval():
+    """Seconds autosaves are coalesced in the cache, 0 to write them through.
+
+    Coalesced answers exist only in the cache until they are flushed, so
+    this needs a cache that never culls them and whose ``add()`` is atomic,
+    to lock the sheet: Redis, or local memory on a single-process server.
+    The file cache has neither and writes every autosave through.
+    """
+    interval = getattr(settings, 'QUIZ_AUTOSAVE_FLUSH_SECONDS', 30)
+    if not isinstance(caches['state'], (RedisCache, LocMemCache)):
+        return 0
+    return interval
+
+
+def _match_answers(option_map, drawn, data, strict):
+    answers = {}
+    for key, value in data.items():
+        if not key.startswith('question_') or not value:
+            continue
+        try:
+            question_id = int(key[len('question_'):])
+            option_id = int(value)
+        except (TypeError, ValueError):
+            question_id = option_id = None
+        if (question_id is None or option_map.get(option_id) != question_id
+                or (drawn is not None and question_id not in drawn)):
+            if strict:
+                raise Http404("No Option matches the given query.")
+            continue
+        answers[question_id] = option_id
+    return answers
+
+
+def parse_answers(attempt, data, strict=True):
+    """Map posted ``question_<id>`` values to validated option ids.
+
+    Options are checked against the quiz's cached answer key, and for a
+    question pool only the questions drawn for the attempt are accepted.
+    With ``strict`` an invalid answer raises ``Http404``, otherwise it is
+    skipped.
+    """
+    option_map = get_answer_key(attempt.quiz_id).options
+    drawn = None
+    if attempt.quiz.questions_per_attempt:
+        drawn = {question['id'] for question in attempt_questions(attempt.quiz, attempt)}
+    return _match_answers(option_map, drawn, data, strict)
+
+
+async def aparse_answers(attempt, data, strict=True):
+    option_map = (await aget_answer_key(attempt.quiz_id)).options
+    drawn = None
+    if attempt.quiz.questions_per_attempt:
+        questions = await sync_to_async(attempt_questions)(attempt.quiz, attempt)
+        drawn = {question['id'] for question in questions}
+    return _match_answers(option_map, drawn, data, strict)
+
+
+_RESPONSE_UPSERT = {
+    'update_conflicts': True,
+    'unique_fields': ['attempt', 'question'],
+    'update_fields': ['selected_option'],
+}
+
+
+def _responses(attempt, answers):
+    return [
+        Response(attempt=attempt, question_id=question_id, selected_option_id=option_id)
+        for question_id, option_id in answers.items()
+    ]
+
+
+def upsert_responses(attempt, answers):
+    """Insert or update one response per answered question in one query."""
+    return Response.objects.bulk_create(_responses(attempt, answers), **_RESPONSE_UPSERT)
+
+
+def pending_answers(attempt):
+    """Answers autosaved in the cache. Flushed answers stay there too, until
+    the attempt is submitted."""
+    sheet = autosaves.get(_sheet_key(attempt.id))
+    return sheet['answers'] if sheet else {}
+
+
+async def apending_answers(attempt):
+    sheet = await autosaves.aget(_sheet_key(attempt.id))
+    return sheet['answers'] if sheet else {}
+
+
+def saved_answers(attempt):
+    """Everything an in-progress attempt has answered so far."""
+    answers = dict(
+        Response.objects.filter(attempt=attempt, selected_option__isnull=False)
+        .values_list('question_id', 'selected_option_id')
+    )
+    answers.update(pending_answers(attempt))
+    return answers
+
+
+async def asaved_answers(attempt):
+    answers = {
+        question_id: option_id async for question_id, option_id in
+        Response.objects.filter(attempt=attempt, selected_option__isnull=False)
+        .values_list('question_id', 'selected_option_id')
+    }
+    answers.update(await apending_answers(attempt))
+    return answers
+
+
+def save_answers(attempt, data, now=None):
+    """Autosave a batch of answer changes for an in-progress attempt.
+
+    Changes are coalesced in the attempt's sheet, one cache entry, and
+    written to ``Response`` with a single upsert once
+    ``flush_interval()`` seconds have passed since the last flush (0 writes
+    through on every save). Saves that overlap (the periodic save and the
+    one sent when the page is hidden) take turns on the sheet, so neither
+    drops the other's answers. Returns the number of accepted answers and
+    whether this call flushed.
+    """
+    now = time.time() if now is None else now
+    answers = parse_answers(attempt, data, strict=False)
+    interval = flush_interval()
+    if not interval:
+        if answers:
+            upsert_responses(attempt, answers)
+        return len(answers), bool(answers)
+
+    lock = _lock_key(attempt.id)
+    while not autosaves.add(lock, True, LOCK_TIMEOUT):
+        time.sleep(0.005)
+    try:
+        # The first save starts the flush interval.
+        sheet = autosaves.get(_sheet_key(attempt.id)) or {'flushed_at': now, 'answers': {}}
+        sheet['answers'].update(answers)
+        flushed = now - sheet['flushed_at'] >= interval and bool(sheet['answers'])
+        if flushed:
+            sheet['flushed_at'] = now
+        autosaves.set(_sheet_key(attempt.id), sheet, AUTOSAVE_TIMEOUT)
+    finally:
+        autosaves.delete(lock)
+    if flushed:
+        upsert_responses(attempt, sheet['answers'])
+    return len(answers), flushed
+
+
+def _store_submission(attempt, answers):
+    if getattr(settings, 'QUIZ_SUBMIT_QUEUE', False):
+        enqueue_submission(attempt, answers)
+        return []
+    with transaction.atomic():
+        responses = upsert_responses(attempt, answers)
+        attempt.completed = True
+        attempt.save(update_fields=['completed'])
+        score_attempt(attempt, list(answers.values()))
+    return responses
+
+
+def submit_attempt(attempt, data, strict=True):
+    """Store every answer of an attempt, mark it completed and score it.
+
+    Posted answers win over autosaved ones; all of them are written with a
+    single upsert inside one transaction. With ``QUIZ_SUBMIT_QUEUE`` the
+    answers are queued instead and the grading worker stores and scores them.
+    Past the attempt's deadline only the answers autosaved in time count.
+    """
+    answers = saved_answers(attempt)
+    if not deadline_passed(attempt):
+        answers.update(parse_answers(attempt, data, strict=strict))
+    responses = _store_submission(attempt, answers)
+    autosaves.delete(_sheet_key(attempt.id))
+    return responses
+
+
+async def asubmit_attempt(attempt, data, strict=True):
+    """Async ``submit_attempt`` for the ASGI views.
+
+    The reads run on the async ORM and the cache. The async ORM cannot open
+    a transaction, so the writes go to a worker thread as one transaction,
+    holding the database write lock once per submission just like the sync
+    path. That thread is the request's own (see ``quiz_portal/asgi.py``),
+    which already holds the connection of the reads; a pooled thread
+    (``thread_sensitive=False``) would take a second one.
+    """
+    answers = await asaved_answers(attempt)
+    if not deadline_passed(attempt):
+        answers.update(await aparse_answers(attempt, data, strict=strict))
+    responses = await sync_to_async(_store_submission)(attempt, answers)
+    await autosaves.adelete(_sheet_key(attempt.id))
+    return responses
+
+
+def submit_expired_attempts(batch_size=500, now=None):
+    """Submit and score one batch of open attempts past their deadline;
+    returns how many.
+
+    Attempts are taken in deadline order from the partial index on open
+    attempts, so each batch costs the same however many are still open.
+    Their autosaved answers are written with one upsert and the batch is
+    scored with ``score_attempts``. Sweepers skip rows another one has
+    locked where the database allows.
+    """
+    cutoff = (now or timezone.now()) - grace()
+    with transaction.atomic():
+        attempts = list(
+            QuizAttempt.objects.select_for_update(skip_locked=True)
+            .filter(completed=False, deadline__lt=cutoff)
+            .order_by('deadline')
+            .only('id', 'quiz_id', 'student_id')[:batch_size]
+        )
+        if not attempts:
+            return 0
+        keys = {_sheet_key(attempt.id): attempt.id for attempt in attempts}
+        sheets = autosaves.get_many(keys)
+        Response.objects.bulk_create([
+            Response(attempt_id=keys[key], question_id=question_id, selected_option_id=option_id)
+            for key, sheet in sheets.items() for question_id, option_id in sheet['answers'].items()
+        ], **_RESPONSE_UPSERT)
+        QuizAttempt.objects.filter(id__in=list(keys.values())).update(completed=True)
+        score_attempts(attempts)
+    autosaves.delete_many(list(sheets))
+    return len(attempts)
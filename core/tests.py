@@ -1,2 +1,1222 @@
-from django.test import TestCase
+import io
+import os
+import re
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import timedelta
+from unittest import mock, skipUnless
 
+from django.contrib.auth.models import User
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError, connection
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import path, reverse
+from django.utils import timezone
+
+from . import async_views, importer, urls as core_urls
+
+from .analytics import quiz_analytics
+from .bench import answer_sheet, bench_caches, make_quiz
+from .deadlines import reset_deadlines
+from .dashboard import SCHEDULE_KEY, close_expired_quizzes
+from .answer_key import _local_keys, _version_key, get_answer_key
+from .importer import import_questions
+from .paper import attempt_questions, generate_paper, get_paper
+from .scoring import grade_quiz
+from .submission_queue import enqueue_submission, process_pending
+from .submission import pending_answers, save_answers, saved_answers, submit_attempt, submit_expired_attempts
+from .leaderboard import leaderboard_page, leaderboard_query, parse_cursor, ranked_results
+from .models import (
+    Quiz, Question, Option, PendingSubmission, QuizAttempt, Response, Result, Student, StudentQuizStatus,
+    Teacher
+)
+
+
+@contextmanager
+def shared_cache():
+    """File caches, shared between processes as in production, for commands
+    that must see what the web workers cached."""
+    with tempfile.TemporaryDirectory() as location:
+        caches = {
+            alias: {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                    'LOCATION': os.path.join(location, alias)}
+            for alias in ('default', 'sessions', 'state')
+        }
+        with override_settings(CACHES=caches):
+            yield
+
+
+def clear_caches():
+    for backend in caches.all():
+        backend.clear()
+
+
+def quiz_options(quiz):
+    """The options of a ``make_quiz`` quiz, one list per question; option 0
+    of each list is the correct one."""
+    options = {}
+    for option in Option.objects.filter(question__quiz=quiz).order_by('question_id', 'order'):
+        options.setdefault(option.question_id, []).append(option)
+    return list(options.values())
+
+
+def answer_picks(options, picks):
+    """POST data choosing option ``picks[i]`` of question ``i``; ``None``
+    leaves the question blank."""
+    return {
+        f'question_{question[0].question_id}': str(question[pick].id)
+        for question, pick in zip(options, picks) if pick is not None
+    }
+
+
+class AnswerKeyTests(TestCase):
+    """Editing a quiz's questions or options must drop its cached answer
+    key and paper, in this process and in every other worker."""
+
+    def setUp(self):
+        clear_caches()
+        self.quiz = make_quiz(2)
+        self.question = self.quiz.questions.order_by('id').first()
+        self.options = list(self.question.options_set.order_by('order'))
+
+    def test_saving_an_option_invalidates_the_key(self):
+        self.assertIn(self.options[0].id, get_answer_key(self.quiz.id).correct_options)
+        self.options[0].is_correct = False
+        self.options[0].save()
+        self.options[1].is_correct = True
+        self.options[1].save()
+        key = get_answer_key(self.quiz.id)
+        self.assertNotIn(self.options[0].id, key.correct_options)
+        self.assertIn(self.options[1].id, key.correct_options)
+
+    def test_deleting_an_option_invalidates_the_key_and_paper(self):
+        get_answer_key(self.quiz.id)
+        get_paper(self.quiz)
+        self.options[0].delete()
+        self.assertNotIn(self.options[0].id, get_answer_key(self.quiz.id).options)
+        self.assertNotIn(self.options[0].id, [o['id'] for o in get_paper(self.quiz)['questions'][0]['options']])
+
+    def test_adding_and_deleting_questions_invalidates_the_key_and_paper(self):
+        self.assertEqual(get_answer_key(self.quiz.id).total_questions, 2)
+        self.assertEqual(len(get_paper(self.quiz)['questions']), 2)
+        Question.objects.create(quiz=self.quiz, text='New')
+        self.assertEqual(get_answer_key(self.quiz.id).total_questions, 3)
+        self.assertEqual(len(get_paper(self.quiz)['questions']), 3)
+        self.question.delete()
+        self.assertEqual(get_answer_key(self.quiz.id).total_questions, 2)
+        self.assertEqual(len(get_paper(self.quiz)['questions']), 2)
+
+    def test_a_change_made_by_another_worker_is_seen(self):
+        get_answer_key(self.quiz.id)
+        # Another process fixed the key: it changed the row and bumped the
+        # shared version, but this process still holds its compiled copy.
+        Option.objects.filter(id=self.options[0].id).update(is_correct=False)
+        caches['state'].set(_version_key(self.quiz.id), 'bumped elsewhere')
+        self.assertNotIn(self.options[0].id, get_answer_key(self.quiz.id).correct_options)
+
+
+class WarmQuizTests(TestCase):
+
+    def setUp(self):
+        clear_caches()
+        now = timezone.now()
+        self.quiz = make_quiz(3)
+        Quiz.objects.filter(pk=self.quiz.pk).update(
+            start_time=now + timedelta(minutes=10), end_time=now + timedelta(hours=1))
+        self.quiz.refresh_from_db()
+
+    def test_warms_the_shared_cache(self):
+        out = io.StringIO()
+        with shared_cache():
+            call_command('warm_quiz', '--lead-minutes', '15', stdout=out)
+            # As a web worker would: nothing compiled in this process.
+            _local_keys.clear()
+            with CaptureQueriesContext(connection) as ctx:
+                get_answer_key(self.quiz.id)
+                get_paper(self.quiz)
+        self.assertIn(f'Warmed quiz {self.quiz.id}', out.getvalue())
+        self.assertEqual(len(ctx), 0)
+
+    def test_the_warmed_schedule_lasts_until_the_quiz_starts(self):
+        with shared_cache():
+            call_command('warm_quiz', '--lead-minutes', '15', stdout=io.StringIO())
+            start = self.quiz.start_time.timestamp()
+            with mock.patch('django.core.cache.backends.filebased.time') as clock:
+                clock.time.return_value = start + 30
+                self.assertIsNotNone(cache.get(SCHEDULE_KEY))
+
+    def test_refuses_a_per_process_cache(self):
+        # The test suite itself runs on local memory caches.
+        with self.assertRaisesMessage(CommandError, 'local memory'):
+            call_command('warm_quiz', str(self.quiz.id), stdout=io.StringIO())
+
+
+class BenchCachesTests(TestCase):
+    """Benchmarks clear their caches; that must never reach the site's."""
+
+    def redis(self, location):
+        return override_settings(BENCH_REDIS_DB=15, CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': location,
+        }})
+
+    def test_redis_moves_to_the_benchmark_database(self):
+        with self.redis('redis://cache:6379/0,redis://replica:6379'), bench_caches():
+            self.assertEqual(settings.CACHES['default']['LOCATION'],
+                             ['redis://cache:6379/15', 'redis://replica:6379/15'])
+
+    def test_refuses_the_sites_own_redis_database(self):
+        with self.redis('redis://cache:6379/15'), self.assertRaises(ImproperlyConfigured):
+            with bench_caches():
+                pass
+
+
+class IndexUsageTests(TestCase):
+    """The hot lookups of the views must be served by an index."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='student', password='pass')
+        cls.quiz = Quiz.objects.create(name='Quiz')
+        cls.question = Question.objects.create(quiz=cls.quiz, text='Q1')
+        cls.attempt = QuizAttempt.objects.create(student=cls.user, quiz=cls.quiz, completed=True)
+        Response.objects.create(attempt=cls.attempt, question=cls.question)
+        Result.objects.create(attempt=cls.attempt, quiz=cls.quiz, student=cls.user)
+
+    def assertUsesIndex(self, queryset, table):
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+            plan = queryset.explain()
+            self.assertNotIn(f'Seq Scan on {table}', plan)
+        else:
+            plan = queryset.explain()
+            self.assertIn(table, plan)
+            self.assertNotRegex(plan, rf'\bSCAN {table}\b(?! USING (COVERING )?INDEX)')
+
+    def test_open_attempt_lookup(self):
+        # take_quiz / submit_quiz
+        self.assertUsesIndex(
+            QuizAttempt.objects.filter(student=self.user, quiz=self.quiz, completed=False),
+            'core_quizattempt',
+        )
+
+    def test_submitted_quizzes(self):
+        # student_dashboard
+        self.assertUsesIndex(
+            Quiz.objects.filter(quizattempt__student=self.user, quizattempt__completed=True).distinct(),
+            'core_quizattempt',
+        )
+
+    def test_quiz_schedule(self):
+        # student_dashboard, via core.dashboard
+        self.assertUsesIndex(
+            Quiz.objects.filter(active=True, start_time__isnull=False, end_time__gte=timezone.now()),
+            'core_quiz',
+        )
+
+    def test_responses_of_attempt(self):
+        # quiz_result
+        self.assertUsesIndex(Response.objects.filter(attempt=self.attempt), 'core_response')
+
+    def test_result_of_student(self):
+        # quiz_result
+        self.assertUsesIndex(
+            Result.objects.filter(quiz=self.quiz, student=self.user).order_by('-id'),
+            'core_result',
+        )
+
+    def test_results_of_quiz_by_score(self):
+        # view_responses
+        self.assertUsesIndex(Result.objects.filter(quiz=self.quiz).order_by('-score'), 'core_result')
+
+    def test_results_of_student(self):
+        # student_dashboard / student_dashboard_submitted
+        self.assertUsesIndex(Result.objects.filter(student=self.user), 'core_result')
+
+    @skipUnless(connection.vendor == 'sqlite', 'SQLite plan wording')
+    def test_score_ordering_uses_composite_index(self):
+        plan = Result.objects.filter(quiz=self.quiz).order_by('-score').explain()
+        self.assertTrue(re.search(r'result_quiz_score_idx', plan), plan)
+
+    def test_leaderboard_page_seeks_on_the_score_index(self):
+        # view_responses, any page
+        query = leaderboard_query(self.quiz, (5, 1, 1, 1))
+        self.assertUsesIndex(query, 'core_result')
+        self.assertNotIn('RANK', str(query.query))
+        if connection.vendor == 'sqlite':
+            plan = query.explain()
+            self.assertIn('result_quiz_score_idx', plan)
+            self.assertNotIn('TEMP B-TREE', plan)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class QueryBudgetTests(TestCase):
+    """Every route in core/urls.py must stay within a fixed query budget,
+    however much history the database holds."""
+
+    NUM_QUIZZES = 200
+    NUM_QUESTIONS = 20
+    NUM_STUDENTS = 300
+    MAX_SECONDS = 2.0
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        cls.teacher_user = User.objects.create_user(username='teacher', password='pass')
+        cls.teacher = Teacher.objects.create(user=cls.teacher_user)
+
+        Quiz.objects.bulk_create([
+            Quiz(name=f'Quiz {i}', created_by=cls.teacher,
+                 start_time=now - timedelta(hours=1), end_time=now + timedelta(hours=1))
+            for i in range(cls.NUM_QUIZZES)
+        ])
+        quizzes = list(Quiz.objects.order_by('id'))
+        Question.objects.bulk_create([
+            Question(quiz=quiz, text=f'Question {j}')
+            for quiz in quizzes for j in range(cls.NUM_QUESTIONS)
+        ])
+        questions = list(Question.objects.order_by('id'))
+        Option.objects.bulk_create([
+            Option(question=question, option_text=f'Option {k}', is_correct=(k == 0), order=k + 1)
+            for question in questions for k in range(4)
+        ])
+
+        User.objects.bulk_create([User(username=f'student{i}') for i in range(cls.NUM_STUDENTS)])
+        users = list(User.objects.filter(username__startswith='student').order_by('id'))
+        Student.objects.bulk_create([Student(user=user) for user in users])
+        cls.student_user = users[0]
+        cls.student_user.set_password('pass')
+        cls.student_user.save()
+
+        # The student has a long history; everybody has sat the first quiz.
+        cls.exam, cls.fresh_quiz = quizzes[0], quizzes[-1]
+        attempts = [
+            QuizAttempt(student=cls.student_user, quiz=quiz, completed=True)
+            for quiz in quizzes[:cls.NUM_QUIZZES // 2]
+        ] + [
+            QuizAttempt(student=user, quiz=quiz, completed=True)
+            for user in users[1:] for quiz in quizzes[:10]
+        ]
+        QuizAttempt.objects.bulk_create(attempts)
+        attempts = list(QuizAttempt.objects.all())
+        first_questions = {}
+        for question in questions:
+            first_questions.setdefault(question.quiz_id, []).append(question)
+        exam_attempts = [a for a in attempts if a.quiz_id == cls.exam.id]
+        Response.objects.bulk_create([
+            Response(attempt=attempt, question=question, selected_option_id=None)
+            for attempt in exam_attempts for question in first_questions[cls.exam.id]
+        ])
+        Result.objects.bulk_create([
+            Result(attempt=a, quiz_id=a.quiz_id, student_id=a.student_id,
+                   score=a.id % cls.NUM_QUESTIONS, total_questions=cls.NUM_QUESTIONS,
+                   total_attempted=cls.NUM_QUESTIONS)
+            for a in attempts
+        ])
+        StudentQuizStatus.objects.bulk_create([
+            StudentQuizStatus(student_id=a.student_id, quiz_id=a.quiz_id,
+                              status=StudentQuizStatus.SUBMITTED, total_questions=cls.NUM_QUESTIONS)
+            for a in attempts
+        ])
+
+    def setUp(self):
+        clear_caches()
+
+    def student_client(self):
+        self.client.force_login(self.student_user)
+        return self.client
+
+    def teacher_client(self):
+        self.client.force_login(self.teacher_user)
+        return self.client
+
+    def assertBudget(self, max_queries, method, url, data=None):
+        with CaptureQueriesContext(connection) as ctx:
+            start = time.perf_counter()
+            response = getattr(self.client, method)(url, data)
+            elapsed = time.perf_counter() - start
+        self.assertLess(response.status_code, 400)
+        self.assertLessEqual(
+            len(ctx), max_queries,
+            f'{method.upper()} {url} ran {len(ctx)} queries:\n'
+            + '\n'.join(q['sql'] for q in ctx.captured_queries),
+        )
+        self.assertLess(elapsed, self.MAX_SECONDS, f'{method.upper()} {url} took {elapsed:.2f}s')
+        return response
+
+    def test_landing(self):
+        self.assertBudget(0, 'get', reverse('landing'))
+
+    def test_register_pages(self):
+        self.assertBudget(0, 'get', reverse('student_register'))
+        self.assertBudget(0, 'get', reverse('teacher_register'))
+
+    def test_student_register(self):
+        self.assertBudget(11, 'post', reverse('student_register'), {
+            'username': 'newstudent', 'email': 'new@example.com',
+            'password': 'pass', 'confirm_password': 'pass',
+        })
+
+    def test_teacher_register(self):
+        self.assertBudget(11, 'post', reverse('teacher_register'), {
+            'username': 'newteacher', 'email': 'new@example.com',
+            'password': 'pass', 'confirm_password': 'pass',
+        })
+
+    def test_login_pages(self):
+        self.assertBudget(0, 'get', reverse('student_login'))
+        self.assertBudget(0, 'get', reverse('teacher_login'))
+
+    def test_student_login(self):
+        self.assertBudget(9, 'post', reverse('student_login'),
+                          {'username': self.student_user.username, 'password': 'pass'})
+
+    def test_teacher_login(self):
+        self.assertBudget(9, 'post', reverse('teacher_login'),
+                          {'username': 'teacher', 'password': 'pass'})
+
+    def test_logout(self):
+        self.student_client()
+        self.assertBudget(3, 'get', reverse('logout'))
+
+    def test_student_dashboard(self):
+        self.student_client()
+        self.assertBudget(5, 'get', reverse('student_dashboard'))
+
+    def test_student_dashboard_submitted(self):
+        self.student_client()
+        self.assertBudget(4, 'get', reverse('student_dashboard_submitted'))
+
+    def test_teacher_dashboard(self):
+        self.teacher_client()
+        response = self.assertBudget(4, 'get', reverse('teacher_dashboard'))
+        exam = next(quiz for quiz in response.context['quizzes'] if quiz.id == self.exam.id)
+        self.assertEqual((exam.question_count, exam.submission_count), (self.NUM_QUESTIONS, self.NUM_STUDENTS))
+
+    def test_create_quiz(self):
+        self.teacher_client()
+        self.assertBudget(3, 'get', reverse('create_quiz'))
+        now = timezone.now()
+        self.assertBudget(4, 'post', reverse('create_quiz'), {
+            'name': 'New quiz', 'description': '',
+            'start_time': now.strftime('%Y-%m-%dT%H:%M'),
+            'end_time': (now + timedelta(hours=1)).strftime('%Y-%m-%dT%H:%M'),
+        })
+
+    def test_delete_quiz(self):
+        # The cascade runs the Question/Option delete signals once per row,
+        # so this budget follows the size of the quiz, not the history.
+        self.teacher_client()
+        self.assertBudget(92, 'get', reverse('delete_quiz', args=[self.fresh_quiz.id]))
+
+    def test_add_question(self):
+        self.teacher_client()
+        url = reverse('add_question', args=[self.fresh_quiz.id])
+        self.assertBudget(3, 'get', url)
+        self.assertBudget(5, 'post', url, {
+            'question': 'New question', 'options[]': ['a', 'b', 'c', 'd'], 'correct_option': '0',
+        })
+
+    def test_import_questions(self):
+        self.teacher_client()
+        url = reverse('import_questions', args=[self.fresh_quiz.id])
+        self.assertBudget(3, 'get', url)
+        upload = SimpleUploadedFile('bank.csv', '\n'.join(
+            f'Question {i},a,b,c,d,2' for i in range(300)).encode())
+        response = self.assertBudget(11, 'post', url, {'questions_file': upload})
+        self.assertEqual(response.context['import_report'].imported, 300)
+
+    def test_preview_quiz(self):
+        self.teacher_client()
+        self.assertBudget(5, 'get', reverse('preview_quiz', args=[self.exam.id]))
+
+    def test_view_responses(self):
+        self.teacher_client()
+        response = self.assertBudget(4, 'get', reverse('view_responses', args=[self.exam.id]))
+        self.assertBudget(4, 'get', reverse('view_responses', args=[self.exam.id]),
+                          {'after': response.context['next_cursor']})
+
+    def test_view_responses_stream(self):
+        self.teacher_client()
+        response = self.assertBudget(4, 'get', reverse('view_responses', args=[self.exam.id]), {'stream': 1})
+        body = b''.join(response.streaming_content).decode()
+        self.assertEqual(body.count('<tr>'), self.NUM_STUDENTS + 1)
+
+    def test_export_results(self):
+        self.teacher_client()
+        url = reverse('export_results', args=[self.exam.id])
+        response = self.assertBudget(3, 'get', url, {'kind': 'responses', 'format': 'csv'})
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 1 + self.NUM_STUDENTS * self.NUM_QUESTIONS)
+        response = self.assertBudget(3, 'get', url, {'kind': 'results', 'format': 'jsonl'})
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), self.NUM_STUDENTS)
+
+    def test_quiz_analytics(self):
+        self.teacher_client()
+        url = reverse('quiz_analytics', args=[self.exam.id])
+        response = self.assertBudget(10, 'get', url)
+        self.assertEqual(response.context['results'], self.NUM_STUDENTS)
+        self.assertBudget(4, 'get', url)
+
+    def test_leaderboard_pages_match_full_ranking(self):
+        full = [(r.rank, r.id) for r in ranked_results(self.exam)]
+        paged, cursor = [], None
+        while True:
+            rows, cursor = leaderboard_page(self.exam, cursor and parse_cursor(cursor), size=7)
+            paged.extend((r.rank, r.id) for r in rows)
+            if cursor is None:
+                break
+        self.assertEqual(paged, full)
+        self.assertEqual(full[0][0], 1)
+
+    def test_take_quiz(self):
+        self.student_client()
+        # Starting the attempt runs its INSERT in a savepoint.
+        self.assertBudget(11, 'get', reverse('take_quiz', args=[self.fresh_quiz.id]))
+        self.assertBudget(6, 'get', reverse('take_quiz', args=[self.fresh_quiz.id]))
+
+    def test_autosave(self):
+        self.student_client()
+        self.client.get(reverse('take_quiz', args=[self.fresh_quiz.id]))
+        get_answer_key(self.fresh_quiz.id)
+        # User and attempt; the session and the answers come from the cache.
+        response = self.assertBudget(2, 'post', reverse('autosave_answers', args=[self.fresh_quiz.id]),
+                                     answer_sheet(self.fresh_quiz))
+        self.assertEqual(response.json()['flushed'], False)
+
+    def test_take_quiz_post(self):
+        self.student_client()
+        self.assertBudget(22, 'post', reverse('take_quiz', args=[self.fresh_quiz.id]),
+                          answer_sheet(self.fresh_quiz))
+
+    def test_submit_quiz(self):
+        self.student_client()
+        self.client.get(reverse('take_quiz', args=[self.fresh_quiz.id]))
+        self.assertBudget(18, 'post', reverse('submit_quiz', args=[self.fresh_quiz.id]),
+                          answer_sheet(self.fresh_quiz))
+
+    @override_settings(QUIZ_SUBMIT_QUEUE=True)
+    def test_submit_quiz_queued(self):
+        self.student_client()
+        self.client.get(reverse('take_quiz', args=[self.fresh_quiz.id]))
+        self.assertBudget(12, 'post', reverse('submit_quiz', args=[self.fresh_quiz.id]),
+                          answer_sheet(self.fresh_quiz))
+
+    def test_quiz_result(self):
+        self.student_client()
+        self.assertBudget(5, 'get', reverse('quiz_result', args=[self.exam.id]))
+
+    @override_settings(QUIZ_METRICS=True)
+    def test_metrics(self):
+        self.student_client()
+        self.client.get(reverse('student_dashboard'))
+        response = self.assertBudget(0, 'get', reverse('metrics'))
+        self.assertContains(response, 'quiz_requests_total{view="student_dashboard"} 1')
+        self.assertContains(response, 'quiz_sql_queries_total{view="student_dashboard"} ')
+
+    def test_metrics_disabled(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 404)
+
+
+class ImportQuestionsTests(TestCase):
+
+    def setUp(self):
+        self.quiz = Quiz.objects.create(name='Bank')
+
+    def test_csv_rejects_malformed_rows_with_line_numbers(self):
+        lines = [
+            'question,option 1,option 2,option 3,correct\n',
+            'Capital of France?,Paris,Rome,Berlin,Paris\n',
+            'Too few cells,only\n',
+            '2 + 2?,3,4,5,2\n',
+            'Bad answer,a,b,c,9\n',
+        ]
+        report = import_questions(self.quiz, lines, 'csv')
+        self.assertEqual(report.imported, 2)
+        self.assertEqual([line for line, _ in report.errors], [3, 5])
+        key = get_answer_key(self.quiz.id)
+        self.assertEqual(key.total_questions, 2)
+        correct = Option.objects.filter(id__in=key.correct_options).order_by('id')
+        self.assertEqual([o.option_text for o in correct], ['Paris', '4'])
+
+    def test_csv_line_numbers_count_multiline_cells(self):
+        lines = [
+            '"Which line\n',
+            'is this on?",1,2,1\n',
+            'Too few cells,only\n',
+            '"Multi\n',
+            'line\n',
+            'question",a,b,c,2\n',
+            'Bad answer,a,b,c,9\n',
+        ]
+        report = import_questions(self.quiz, lines, 'csv')
+        self.assertEqual(report.imported, 2)
+        self.assertEqual([line for line, _ in report.errors], [3, 7])
+
+    def test_undecodable_lines_are_rejected_and_the_rest_imports(self):
+        self.assertEqual(get_answer_key(self.quiz.id).total_questions, 0)
+        lines = [
+            '\ufeffquestion,option 1,option 2,correct\n'.encode(),
+            'Capital of France?,Paris,Rome,1\n'.encode(),
+            'Caf\xe9?,yes,no,1\n'.encode('latin-1'),
+            '2 + 2?,3,4,2\n'.encode(),
+        ]
+        report = import_questions(self.quiz, lines, 'csv', batch_size=1)
+        self.assertEqual(report.imported, 2)
+        self.assertEqual(report.errors, [(3, "the line is not UTF-8 text")])
+        self.assertEqual(get_answer_key(self.quiz.id).total_questions, 2)
+
+    def test_a_failed_batch_still_drops_the_cached_content(self):
+        self.assertEqual(get_answer_key(self.quiz.id).total_questions, 0)
+        write_batch = importer._write_batch
+
+        def write_then_fail(quiz, batch):
+            if self.quiz.questions.exists():
+                raise DatabaseError('disk full')
+            write_batch(quiz, batch)
+
+        with mock.patch('core.importer._write_batch', write_then_fail):
+            with self.assertRaises(DatabaseError):
+                import_questions(self.quiz, [f'Question {i},a,b,1\n' for i in range(3)], 'csv', batch_size=2)
+        self.assertEqual(get_answer_key(self.quiz.id).total_questions, 2)
+
+    def test_json_lines(self):
+        lines = [
+            '{"question": "Largest planet?", "options": ["Mars", "Jupiter"], "correct": 2}\n',
+            '{"question": "Broken", "options": []\n',
+        ]
+        report = import_questions(self.quiz, lines, 'json')
+        self.assertEqual(report.imported, 1)
+        self.assertEqual(report.errors[0][0], 2)
+
+    def test_gift(self):
+        lines = [
+            '// comment\n',
+            '::Q1:: Which is a prime? { =7 ~8 ~9 }\n',
+            '\n',
+            'Which colour\n',
+            'is the sky? {\n',
+            '  ~green\n',
+            '  =blue\n',
+            '}\n',
+            '\n',
+            'No answers here\n',
+        ]
+        report = import_questions(self.quiz, lines, 'gift')
+        self.assertEqual(report.imported, 2)
+        self.assertEqual(report.errors, [(10, "expected 'question { =right ~wrong }'")])
+        self.assertEqual(
+            list(self.quiz.questions.order_by('id').values_list('text', flat=True)),
+            ['Which is a prime?', 'Which colour is the sky?'],
+        )
+
+
+class QuestionPoolTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='student', password='pass')
+        self.quiz = make_quiz(20, name='Pool', questions_per_attempt=5,
+                              shuffle_questions=True, shuffle_options=True)
+
+    def test_same_seed_same_paper(self):
+        pool = [{'id': i, 'text': str(i), 'options': [{'id': j} for j in range(4)]} for i in range(50)]
+        first = generate_paper(pool, 42, draw=10, shuffle_questions=True, shuffle_options=True)
+        self.assertEqual(first, generate_paper(pool, 42, draw=10, shuffle_questions=True, shuffle_options=True))
+        self.assertEqual(len({q['id'] for q in first}), 10)
+        self.assertNotEqual(first, generate_paper(pool, 43, draw=10, shuffle_questions=True, shuffle_options=True))
+
+    def test_only_drawn_questions_are_scored(self):
+        attempt = QuizAttempt.objects.create(student=self.user, quiz=self.quiz, seed=7)
+        drawn = {q['id'] for q in attempt_questions(self.quiz, attempt)}
+        submit_attempt(attempt, answer_sheet(self.quiz), strict=False)
+        result = Result.objects.get(attempt=attempt)
+        self.assertEqual((result.score, result.total_questions), (5, 5))
+        self.assertEqual(set(Response.objects.filter(attempt=attempt).values_list('question_id', flat=True)), drawn)
+
+
+@override_settings(QUIZ_AUTOSAVE_FLUSH_SECONDS=30)
+class AutosaveTests(TestCase):
+
+    def setUp(self):
+        clear_caches()
+        self.user = User.objects.create_user(username='student', password='pass')
+        self.quiz = make_quiz(3, name='Autosave')
+        self.correct = {options[0].question_id: options[0].id for options in quiz_options(self.quiz)}
+        self.attempt = QuizAttempt.objects.select_related('quiz').get(
+            pk=QuizAttempt.objects.create(student=self.user, quiz=self.quiz).pk)
+
+    def answers(self, **overrides):
+        return {f'question_{q}': str(o) for q, o in dict(self.correct, **overrides).items()}
+
+    def test_saves_are_coalesced_until_the_flush_interval(self):
+        self.assertEqual(save_answers(self.attempt, self.answers(), now=0), (3, False))
+        self.assertEqual(save_answers(self.attempt, self.answers(), now=10), (3, False))
+        self.assertFalse(Response.objects.filter(attempt=self.attempt).exists())
+        self.assertEqual(saved_answers(self.attempt), self.correct)
+
+        self.assertEqual(save_answers(self.attempt, self.answers(), now=30), (3, True))
+        self.assertEqual(Response.objects.filter(attempt=self.attempt).count(), 3)
+
+    def test_overlapping_saves_keep_both_batches(self):
+        first, second = list(self.correct)[:2]
+        attempt, correct = self.attempt, self.correct
+        get_answer_key(self.quiz.id)
+        reading, resume = threading.Event(), threading.Event()
+
+        class Paused:
+            """The state cache, with the first read of a sheet held up."""
+
+            def __getattr__(self, name):
+                return getattr(caches['state'], name)
+
+            def get(self, key, default=None):
+                sheet = caches['state'].get(key, default)
+                if not reading.is_set():
+                    reading.set()
+                    resume.wait(5)
+                return sheet
+
+        def save(question_id, now):
+            save_answers(attempt, {f'question_{question_id}': str(correct[question_id])}, now=now)
+
+        with mock.patch('core.submission.autosaves', Paused()):
+            # The second save arrives while the first holds the sheet.
+            saves = [threading.Thread(target=save, args=(first, 0))]
+            saves[0].start()
+            reading.wait(5)
+            saves.append(threading.Thread(target=save, args=(second, 1)))
+            saves[1].start()
+            time.sleep(0.05)
+            resume.set()
+            for thread in saves:
+                thread.join(5)
+        self.assertEqual(saved_answers(attempt), {first: correct[first], second: correct[second]})
+
+    def test_a_file_cache_writes_every_autosave_through(self):
+        with shared_cache():
+            self.assertEqual(save_answers(self.attempt, self.answers(), now=0), (3, True))
+            self.assertEqual(pending_answers(self.attempt), {})
+        self.assertEqual(Response.objects.filter(attempt=self.attempt).count(), 3)
+
+    def test_submit_merges_pending_answers(self):
+        save_answers(self.attempt, self.answers(), now=0)
+        first = next(iter(self.correct))
+        submit_attempt(self.attempt, {f'question_{first}': str(self.correct[first] + 1)})
+        result = Result.objects.get(attempt=self.attempt)
+        self.assertEqual((result.score, result.total_attempted), (2, 3))
+        self.assertEqual(Response.objects.filter(attempt=self.attempt).count(), 3)
+        self.assertEqual(pending_answers(self.attempt), {})
+
+
+class AsyncURLConf:
+    """core/urls.py as routed with ``QUIZ_ASYNC_VIEWS`` on."""
+    urlpatterns = [
+        path('student/dashboard/', async_views.student_dashboard, name='student_dashboard'),
+        path('quiz/<int:quiz_id>/submit/', async_views.submit_quiz, name='submit_quiz'),
+        path('quiz/<int:quiz_id>/result/', async_views.quiz_result, name='quiz_result'),
+    ] + core_urls.urlpatterns
+
+
+@override_settings(ROOT_URLCONF=AsyncURLConf)
+class AsyncViewTests(TestCase):
+
+    def setUp(self):
+        clear_caches()
+        now = timezone.now()
+        self.user = User.objects.create_user(username='student', password='pass')
+        Student.objects.create(user=self.user)
+        self.quiz = make_quiz(3, name='Async', start_time=now - timedelta(hours=1),
+                              end_time=now + timedelta(hours=1))
+        self.answers = answer_picks(quiz_options(self.quiz), [1, 0, 0])
+
+    async def test_submit_result_and_dashboard(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse('student_dashboard'))
+        self.assertContains(response, 'Async')
+
+        await self.async_client.get(reverse('take_quiz', args=[self.quiz.id]))
+        response = await self.async_client.post(reverse('submit_quiz', args=[self.quiz.id]), self.answers)
+        self.assertRedirects(response, reverse('quiz_result', args=[self.quiz.id]),
+                             fetch_redirect_response=False)
+        result = await Result.objects.aget(quiz=self.quiz, student=self.user)
+        self.assertEqual((result.score, result.total_questions, result.total_attempted), (2, 3, 3))
+
+        response = await self.async_client.get(reverse('quiz_result', args=[self.quiz.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['score'], 2)
+        response = await self.async_client.get(reverse('student_dashboard'))
+        self.assertEqual(response.context['submitted_statuses'][0].score, 2)
+
+    async def test_result_scores_unscored_attempt(self):
+        attempt = await QuizAttempt.objects.acreate(student=self.user, quiz=self.quiz, completed=True)
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse('quiz_result', args=[self.quiz.id]))
+        self.assertEqual(response.context['score'], 0)
+        self.assertTrue(await Result.objects.filter(attempt=attempt).aexists())
+
+
+@override_settings(QUIZ_SUBMIT_QUEUE=True)
+class SubmissionQueueTests(TestCase):
+
+    def setUp(self):
+        clear_caches()
+        now = timezone.now()
+        self.user = User.objects.create_user(username='student', password='pass')
+        self.quiz = make_quiz(3, name='Queued', start_time=now - timedelta(hours=1),
+                              end_time=now + timedelta(hours=1))
+        self.answers = answer_picks(quiz_options(self.quiz), [1, 0, 0])
+        self.client.force_login(self.user)
+
+    def test_result_shows_grading_until_the_worker_runs(self):
+        self.client.get(reverse('take_quiz', args=[self.quiz.id]))
+        self.client.post(reverse('submit_quiz', args=[self.quiz.id]), self.answers)
+        self.assertFalse(Response.objects.exists())
+        response = self.client.get(reverse('quiz_result', args=[self.quiz.id]))
+        self.assertTrue(response.context['grading'])
+        self.assertFalse(Result.objects.exists())
+        # The queued quiz is not offered again on the dashboard.
+        response = self.client.get(reverse('student_dashboard'))
+        self.assertEqual(response.context['available_quizzes'], [])
+        self.assertEqual([s.status for s in response.context['submitted_statuses']], [StudentQuizStatus.GRADING])
+        self.assertContains(response, 'Grading&hellip;')
+
+        self.assertEqual(process_pending(), 1)
+        self.assertEqual(process_pending(), 0)
+        response = self.client.get(reverse('quiz_result', args=[self.quiz.id]))
+        self.assertEqual((response.context['score'], response.context['total']), (2, 3))
+        self.assertEqual(Response.objects.count(), 3)
+        status = StudentQuizStatus.objects.get(student=self.user, quiz=self.quiz)
+        self.assertEqual((status.status, status.score), (StudentQuizStatus.SUBMITTED, 2))
+
+    def test_one_batch_with_two_submissions_of_a_student(self):
+        correct = {int(key[len('question_'):]): int(value) for key, value in self.answers.items()}
+        attempts = []
+        for answers in ({}, correct):
+            attempts.append(QuizAttempt.objects.create(student=self.user, quiz=self.quiz))
+            self.assertTrue(enqueue_submission(attempts[-1], answers))
+        self.assertEqual(process_pending(), 2)
+        self.assertEqual(dict(Result.objects.values_list('attempt_id', 'score')), {attempts[0].id: 0, attempts[1].id: 2})
+        self.assertEqual(StudentQuizStatus.objects.get(student=self.user, quiz=self.quiz).score, 2)
+
+    def test_a_double_submit_is_queued_once(self):
+        self.client.get(reverse('take_quiz', args=[self.quiz.id]))
+        # Two requests that both loaded the attempt while it was open.
+        stale = [QuizAttempt.objects.select_related('quiz').get(student=self.user) for _ in range(2)]
+        submit_attempt(stale[0], self.answers)
+        submit_attempt(stale[1], answer_picks(quiz_options(self.quiz), [0, 0, 0]))
+        self.assertEqual(PendingSubmission.objects.count(), 1)
+        self.assertEqual(process_pending(), 1)
+        self.assertEqual(Result.objects.get(attempt=stale[0]).score, 2)
+
+
+class AnalyticsTests(TestCase):
+
+    # Rows are students, columns questions: the option index each picked (0 is correct).
+    PICKS = [
+        [0, 0, 0],
+        [0, 0, 1],
+        [0, 1, 2],
+        [1, 2, None],
+        [0, 3, 1],
+    ]
+
+    def setUp(self):
+        clear_caches()
+        self.quiz = make_quiz(3, name='Analytics')
+        self.options = quiz_options(self.quiz)
+        for i, row in enumerate(self.PICKS[:4]):
+            self.sit(i, row)
+
+    def sit(self, i, row):
+        user = User.objects.create_user(username=f'student{i}')
+        attempt = QuizAttempt.objects.create(student=user, quiz=self.quiz)
+        submit_attempt(attempt, answer_picks(self.options, row), strict=False)
+
+    def expected(self, rows):
+        correct = [[pick == 0 for pick in row] for row in rows]
+        totals = [sum(row) for row in correct]
+        expected = []
+        for q in range(3):
+            column = [row[q] for row in correct]
+            p_value = sum(column) / len(rows)
+            if 0 < sum(column) < len(rows):
+                mean_1 = sum(t for t, c in zip(totals, column) if c) / sum(column)
+                mean_0 = sum(t for t, c in zip(totals, column) if not c) / (len(rows) - sum(column))
+                mean = sum(totals) / len(totals)
+                std = (sum((t - mean) ** 2 for t in totals) / len(totals)) ** 0.5
+                expected.append((p_value, (mean_1 - mean_0) / std * (p_value * (1 - p_value)) ** 0.5))
+            else:
+                expected.append((p_value, None))
+        return expected
+
+    def assertAnalytics(self, analytics, rows):
+        self.assertEqual(analytics['results'], len(rows))
+        for question, (p_value, discrimination) in zip(analytics['questions'], self.expected(rows)):
+            self.assertAlmostEqual(question['p_value'], p_value)
+            if discrimination is None:
+                self.assertIsNone(question['discrimination'])
+            else:
+                self.assertAlmostEqual(question['discrimination'], discrimination)
+        self.assertEqual(
+            [option['picks'] for option in analytics['questions'][1]['options']],
+            [sum(row[1] == j for row in rows) for j in range(4)],
+        )
+
+    def test_p_value_and_point_biserial(self):
+        analytics = quiz_analytics(self.quiz)
+        self.assertAnalytics(analytics, self.PICKS[:4])
+        self.assertEqual([b['count'] for b in analytics['distribution']], [1, 1, 1, 1])
+
+    def test_new_results_are_added_incrementally(self):
+        quiz_analytics(self.quiz)
+        self.sit(4, self.PICKS[4])
+        with CaptureQueriesContext(connection) as ctx:
+            analytics = quiz_analytics(self.quiz)
+        self.assertAnalytics(analytics, self.PICKS)
+        delta = [q['sql'] for q in ctx.captured_queries if 'core_response' in q['sql']]
+        self.assertEqual(len(delta), 1)
+        self.assertEqual(analytics, quiz_analytics(self.quiz, refresh=True))
+
+
+class AdminChangelistTests(TestCase):
+    """Admin changelists cost a fixed number of queries, whatever the page
+    shows and however many rows the filters could offer."""
+
+    NUM_QUIZZES = 10
+    NUM_QUESTIONS = 10
+    NUM_STUDENTS = 1000
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = User.objects.create_superuser(username='admin', password='pass')
+        teacher = Teacher.objects.create(user=User.objects.create_user(username='teacher'))
+        quizzes = Quiz.objects.bulk_create([
+            Quiz(name=f'Quiz {i}', created_by=teacher) for i in range(cls.NUM_QUIZZES)
+        ])
+        questions = Question.objects.bulk_create([
+            Question(quiz=quiz, text=f'Question {j}') for quiz in quizzes for j in range(cls.NUM_QUESTIONS)
+        ])
+        options = Option.objects.bulk_create([
+            Option(question=question, option_text=f'Option {k}', is_correct=(k == 0), order=k + 1)
+            for question in questions for k in range(4)
+        ])
+        users = User.objects.bulk_create([User(username=f'student{i}') for i in range(cls.NUM_STUDENTS)])
+        students = Student.objects.bulk_create([Student(user=user) for user in users])
+        attempts = QuizAttempt.objects.bulk_create([
+            QuizAttempt(student=user, quiz=quiz, completed=True) for user in users for quiz in quizzes
+        ])
+        by_quiz = {}
+        for question, i in zip(questions, range(0, len(options), 4)):
+            by_quiz.setdefault(question.quiz_id, []).append((question, options[i + question.id % 4]))
+        # 100k responses: every student answers every question of every quiz.
+        Response.objects.bulk_create([
+            Response(attempt=attempt, question=question, selected_option=option,
+                     student=students[index // cls.NUM_QUIZZES])
+            for index, attempt in enumerate(attempts) for question, option in by_quiz[attempt.quiz_id]
+        ], batch_size=5000)
+        Result.objects.bulk_create([
+            Result(attempt=attempt, quiz_id=attempt.quiz_id, student_id=attempt.student_id,
+                   score=3, total_questions=cls.NUM_QUESTIONS, total_attempted=cls.NUM_QUESTIONS)
+            for attempt in attempts
+        ])
+        cls.quiz, cls.question, cls.user = quizzes[0], questions[0], users[0]
+
+    def setUp(self):
+        self.client.force_login(self.admin_user)
+
+    def assertChangelist(self, max_queries, model, params=None):
+        url = reverse(f'admin:core_{model}_changelist')
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(
+            len(ctx), max_queries,
+            f'{url} ran {len(ctx)} queries:\n' + '\n'.join(q['sql'] for q in ctx.captured_queries),
+        )
+        return response
+
+    def test_changelists(self):
+        self.assertEqual(Response.objects.count(), 100_000)
+        for model in ('teacher', 'student', 'quiz', 'question', 'option', 'quizattempt', 'response', 'result'):
+            with self.subTest(model=model):
+                self.assertChangelist(4, model)
+
+    def test_filtered_changelists(self):
+        response = self.assertChangelist(6, 'response', {
+            'attempt__quiz__id__exact': self.quiz.id, 'attempt__student__id__exact': self.user.id,
+        })
+        self.assertEqual(response.context['cl'].result_count, self.NUM_QUESTIONS)
+        response = self.assertChangelist(6, 'result', {'quiz__id__exact': self.quiz.id})
+        self.assertEqual(response.context['cl'].result_count, self.NUM_STUDENTS)
+        self.assertContains(response, f'<option value="{self.quiz.id}" selected>{self.quiz.name}</option>', html=True)
+        self.assertChangelist(6, 'option', {'question__id__exact': self.question.id})
+
+    def test_filter_autocomplete(self):
+        response = self.client.get(reverse('admin:autocomplete'), {
+            'app_label': 'core', 'model_name': 'quizattempt', 'field_name': 'student', 'term': 'student999',
+        })
+        user = User.objects.get(username='student999')
+        self.assertEqual(response.json()['results'], [{'id': str(user.id), 'text': 'student999'}])
+
+    def test_result_total_questions(self):
+        Quiz.objects.filter(pk=self.quiz.pk).update(questions_per_attempt=4)
+        response = self.assertChangelist(6, 'result', {'quiz__id__exact': self.quiz.id})
+        changelist = response.context['cl']
+        self.assertEqual({changelist.model_admin.total_questions_display(row) for row in changelist.result_list}, {4})
+
+
+class AdminActionTests(TestCase):
+
+    def setUp(self):
+        clear_caches()
+        now = timezone.now()
+        self.client.force_login(User.objects.create_superuser(username='admin', password='pass'))
+        self.quiz = make_quiz(3, name='Rescore', start_time=now - timedelta(hours=2),
+                              end_time=now - timedelta(hours=1))
+        self.options = quiz_options(self.quiz)
+        # Everybody picks option 1 of the first question and option 0 of the others.
+        self.users = [User.objects.create_user(username=f'student{i}') for i in range(5)]
+        for user in self.users:
+            attempt = QuizAttempt.objects.create(student=user, quiz=self.quiz)
+            submit_attempt(attempt, answer_picks(self.options, [1, 0, 0]))
+        # One completed attempt was never scored.
+        self.unscored = QuizAttempt.objects.create(student=User.objects.create_user(username='late'),
+                                                   quiz=self.quiz, completed=True)
+
+    def run_action(self, model, action, ids):
+        return self.client.post(reverse(f'admin:core_{model}_changelist'), {
+            'action': action, '_selected_action': ids,
+        }, follow=True)
+
+    def test_rescore_after_fixing_the_answer_key(self):
+        self.assertEqual(set(Result.objects.values_list('score', flat=True)), {2})
+        get_answer_key(self.quiz.id)
+        # The key is fixed behind the signals' back: option 1 was the right answer.
+        first = self.options[0]
+        Option.objects.filter(id=first[0].id).update(is_correct=False)
+        Option.objects.filter(id=first[1].id).update(is_correct=True)
+
+        response = self.run_action('quiz', 'rescore_quizzes', [self.quiz.id])
+        self.assertContains(response, 'Re-scored 6 results of 1 quizzes')
+        self.assertEqual(Result.objects.filter(attempt__student__in=self.users, score=3).count(), 5)
+        self.assertEqual(Result.objects.get(attempt=self.unscored).score, 0)
+        self.assertEqual(
+            set(StudentQuizStatus.objects.filter(student__in=self.users).values_list('status', 'score')),
+            {(StudentQuizStatus.SUBMITTED, 3)},
+        )
+        self.assertIn(first[1].id, get_answer_key(self.quiz.id).correct_options)
+
+        result = Result.objects.filter(quiz=self.quiz).first()
+        response = self.run_action('result', 'rescore_quizzes', [result.id])
+        self.assertContains(response, 'Re-scored 6 results of 1 quizzes')
+
+    def test_close_expired_quizzes(self):
+        running = Quiz.objects.create(name='Running', start_time=timezone.now(),
+                                      end_time=timezone.now() + timedelta(hours=1))
+        response = self.run_action('quiz', 'close_expired', [self.quiz.id, running.id])
+        self.assertContains(response, 'Closed and graded 1 of 2 selected quizzes')
+        self.assertEqual(dict(Quiz.objects.values_list('name', 'active')), {'Rescore': False, 'Running': True})
+
+
+class GradeQuizTests(TestCase):
+
+    def setUp(self):
+        clear_caches()
+        self.quiz = make_quiz(4, num_options=3, name='Grading', end_time=timezone.now() - timedelta(minutes=1))
+        self.options = quiz_options(self.quiz)
+        self.attempts = []
+        # Student i answers the first i questions correctly and the rest wrongly.
+        for i in range(5):
+            user = User.objects.create_user(username=f'student{i}')
+            attempt = QuizAttempt.objects.create(student=user, quiz=self.quiz, completed=True)
+            Response.objects.bulk_create([
+                Response(attempt=attempt, question_id=options[0].question_id,
+                         selected_option=options[0 if q < i else 1])
+                for q, options in enumerate(self.options)
+            ])
+            self.attempts.append(attempt)
+        blank = QuizAttempt.objects.create(student=User.objects.create_user(username='blank'),
+                                           quiz=self.quiz, completed=True)
+        self.attempts.append(blank)
+        QuizAttempt.objects.create(student=User.objects.create_user(username='open'), quiz=self.quiz)
+        queued = QuizAttempt.objects.create(student=User.objects.create_user(username='queued'), quiz=self.quiz)
+        enqueue_submission(queued, {})
+
+    def scores(self):
+        return dict(Result.objects.values_list('attempt_id', 'score'))
+
+    def test_one_grouped_query_and_one_upsert(self):
+        Result.objects.create(attempt=self.attempts[4], quiz=self.quiz, student=self.attempts[4].student, score=0)
+        get_answer_key(self.quiz.id)
+        with CaptureQueriesContext(connection) as ctx:
+            results = grade_quiz(self.quiz.id)
+        # The grouped aggregate, the Result upsert and the dashboard upsert.
+        self.assertEqual(len(ctx), 3)
+        self.assertEqual(len(results), 6)
+        self.assertEqual(self.scores(), {attempt.id: i if i < 5 else 0 for i, attempt in enumerate(self.attempts)})
+        self.assertEqual(Result.objects.get(attempt=self.attempts[3]).total_attempted, 4)
+        self.assertEqual(StudentQuizStatus.objects.get(student=self.attempts[4].student).score, 4)
+
+    def test_a_retake_upserts_one_dashboard_row(self):
+        student = self.attempts[1].student
+        retake = QuizAttempt.objects.create(student=student, quiz=self.quiz, completed=True)
+        Response.objects.bulk_create([
+            Response(attempt=retake, question_id=options[0].question_id, selected_option=options[0])
+            for options in self.options
+        ])
+        grade_quiz(self.quiz.id)
+        self.assertEqual(Result.objects.get(attempt=retake).score, 4)
+        self.assertEqual(StudentQuizStatus.objects.get(student=student).score, 4)
+
+    def test_closing_an_ended_quiz_grades_it(self):
+        self.assertEqual(close_expired_quizzes(), [self.quiz.id])
+        self.assertEqual(len(self.scores()), 6)
+
+
+@override_settings(QUIZ_AUTOSAVE_FLUSH_SECONDS=30, QUIZ_DEADLINE_GRACE_SECONDS=30)
+class DeadlineTests(TestCase):
+
+    def setUp(self):
+        clear_caches()
+        now = timezone.now()
+        self.quiz = make_quiz(3, name='Timed', duration=20,
+                              start_time=now - timedelta(hours=1), end_time=now + timedelta(hours=1))
+        self.correct = answer_sheet(self.quiz)
+        self.user = User.objects.create_user(username='student', password='pass')
+        self.client.force_login(self.user)
+
+    def start(self, minutes_ago):
+        self.client.get(reverse('take_quiz', args=[self.quiz.id]))
+        attempt = QuizAttempt.objects.select_related('quiz').get(student=self.user, completed=False)
+        started_at = timezone.now() - timedelta(minutes=minutes_ago)
+        QuizAttempt.objects.filter(pk=attempt.pk).update(started_at=started_at)
+        reset_deadlines(self.quiz)
+        attempt.refresh_from_db()
+        return attempt
+
+    def test_deadline_is_duration_capped_by_end_time(self):
+        attempt = self.start(0)
+        self.assertAlmostEqual(attempt.deadline, attempt.started_at + timedelta(minutes=20),
+                               delta=timedelta(seconds=1))
+        self.quiz.end_time = attempt.started_at + timedelta(minutes=5)
+        self.quiz.save()
+        attempt.refresh_from_db()
+        self.assertEqual(attempt.deadline, self.quiz.end_time)
+
+    def test_late_answers_are_ignored(self):
+        attempt = self.start(25)
+        first = list(self.correct.items())[:1]
+        save_answers(attempt, dict(first))
+        response = self.client.post(reverse('autosave_answers', args=[self.quiz.id]), self.correct)
+        self.assertEqual(response.status_code, 409)
+        self.client.post(reverse('submit_quiz', args=[self.quiz.id]), self.correct)
+        self.assertEqual(Result.objects.get(attempt=attempt).score, 1)
+
+    def test_opening_an_expired_attempt_submits_it(self):
+        attempt = self.start(25)
+        response = self.client.get(reverse('take_quiz', args=[self.quiz.id]))
+        self.assertRedirects(response, reverse('quiz_result', args=[self.quiz.id]))
+        self.assertTrue(Result.objects.filter(attempt=attempt).exists())
+
+    def test_revisiting_a_submitted_quiz_shows_the_result(self):
+        self.start(0)
+        self.client.post(reverse('submit_quiz', args=[self.quiz.id]), self.correct)
+        url, result_url = reverse('take_quiz', args=[self.quiz.id]), reverse('quiz_result', args=[self.quiz.id])
+        # During the window and again after the quiz has ended.
+        self.assertRedirects(self.client.get(url), result_url)
+        Quiz.objects.filter(pk=self.quiz.pk).update(end_time=timezone.now() - timedelta(minutes=1))
+        self.assertRedirects(self.client.get(url), result_url)
+
+        self.assertEqual(QuizAttempt.objects.filter(student=self.user).count(), 1)
+        self.assertEqual(Result.objects.filter(student=self.user).count(), 1)
+        self.assertEqual(self.client.get(result_url).context['score'], 3)
+        self.assertEqual(StudentQuizStatus.objects.get(student=self.user).score, 3)
+
+    def test_a_closed_quiz_starts_no_attempt(self):
+        url = reverse('take_quiz', args=[self.quiz.id])
+        Quiz.objects.filter(pk=self.quiz.pk).update(active=False)
+        self.assertRedirects(self.client.get(url), reverse('student_dashboard'))
+        Quiz.objects.filter(pk=self.quiz.pk).update(active=True, end_time=timezone.now() - timedelta(minutes=1))
+        self.assertRedirects(self.client.get(url), reverse('student_dashboard'))
+        self.assertFalse(QuizAttempt.objects.exists())
+        self.assertFalse(Result.objects.exists())
+
+    def test_sweeper_submits_expired_attempts_in_batches(self):
+        expired = self.start(25)
+        save_answers(expired, dict(list(self.correct.items())[:2]))
+        running = QuizAttempt.objects.create(
+            student=User.objects.create_user(username='running'), quiz=self.quiz,
+            deadline=timezone.now() + timedelta(minutes=5))
+        in_grace = QuizAttempt.objects.create(
+            student=User.objects.create_user(username='grace'), quiz=self.quiz,
+            deadline=timezone.now() - timedelta(seconds=10))
+        others = QuizAttempt.objects.bulk_create([
+            QuizAttempt(student=User.objects.create_user(username=f'late{i}'), quiz=self.quiz,
+                        deadline=timezone.now() - timedelta(minutes=i + 1))
+            for i in range(4)
+        ])
+
+        self.assertEqual(submit_expired_attempts(batch_size=3), 3)
+        self.assertEqual(submit_expired_attempts(batch_size=3), 2)
+        self.assertEqual(submit_expired_attempts(batch_size=3), 0)
+        self.assertEqual(
+            set(QuizAttempt.objects.filter(completed=False).values_list('id', flat=True)), {running.id, in_grace.id})
+        self.assertEqual(Result.objects.filter(attempt__in=others).count(), 4)
+        self.assertEqual(Result.objects.get(attempt=expired).score, 2)
+        self.assertEqual(pending_answers(expired), {})
+
+    def test_sweep_command_reads_answers_autosaved_by_the_web_workers(self):
+        with shared_cache():
+            expired = self.start(25)
+            save_answers(expired, dict(list(self.correct.items())[:2]))
+            out = io.StringIO()
+            call_command('sweep_attempts', stdout=out)
+        self.assertIn('Submitted 1 expired attempts', out.getvalue())
+        self.assertEqual(Result.objects.get(attempt=expired).score, 2)
+
+    def test_sweep_command_refuses_a_per_process_cache(self):
+        # The test suite itself runs on local memory caches.
+        with self.assertRaisesMessage(CommandError, 'local memory'):
+            call_command('sweep_attempts', stdout=io.StringIO())
+
+
+class AttemptAcquisitionTests(TransactionTestCase):
+    """Parallel requests of one student must share a single open attempt."""
+
+    PARALLEL = 50
+
+    def setUp(self):
+        clear_caches()
+        self.user = User.objects.create_user(username='student', password='pass')
+        self.quiz = make_quiz(1, name='Race', end_time=timezone.now() + timedelta(hours=1))
+
+    def test_parallel_first_requests_create_one_attempt(self):
+        url = reverse('take_quiz', args=[self.quiz.id])
+        clients = []
+        for _ in range(self.PARALLEL):
+            clients.append(Client())
+            clients[-1].force_login(self.user)
+        barrier = threading.Barrier(self.PARALLEL, timeout=30)
+
+        def open_quiz(client):
+            barrier.wait()
+            try:
+                return client.get(url).context['attempt'].id
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=self.PARALLEL) as pool:
+            attempt_ids = set(pool.map(open_quiz, clients))
+
+        self.assertEqual(QuizAttempt.objects.filter(student=self.user, quiz=self.quiz).count(), 1)
+        self.assertEqual(attempt_ids, {QuizAttempt.objects.get().id})
+        self.assertEqual(StudentQuizStatus.objects.filter(student=self.user).count(), 1)
@@ -1,5 +1,9 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
+
+# Under ASGI the student exam views can run natively async (QUIZ_ASYNC_VIEWS).
+exam_views = async_views if settings.QUIZ_ASYNC_VIEWS else views
 
 urlpatterns = [
     path('', views.landing, name='landing'),
@@ -12,22 +16,28 @@ urlpatterns = [
     path('logout/', views.logout_view, name='logout'),
 
    
-    path('student/dashboard/', views.student_dashboard, name='student_dashboard'),
+    path('student/dashboard/', exam_views.student_dashboard, name='student_dashboard'),
     path('teacher/dashboard/', views.teacher_dashboard, name='teacher_dashboard'),
 
    
     path('quiz/create/', views.create_quiz, name='create_quiz'),
     path('quiz/<int:quiz_id>/delete/', views.delete_quiz, name='delete_quiz'),
     path('quiz/<int:quiz_id>/add_question/', views.add_question, name='add_question'),
+    path('quiz/<int:quiz_id>/import/', views.import_questions, name='import_questions'),
     path('quiz/<int:quiz_id>/preview/', views.preview_quiz, name='preview_quiz'),
 
     path('quiz/<int:quiz_id>/responses/', views.view_responses, name='view_responses'),
+    path('quiz/<int:quiz_id>/export/', views.export_results, name='export_results'),
+    path('quiz/<int:quiz_id>/analytics/', views.quiz_analytics, name='quiz_analytics'),
 
     
     path('quiz/<int:quiz_id>/', views.take_quiz, name='take_quiz'),
-    path('quiz/<int:quiz_id>/submit/', views.submit_quiz, name='submit_quiz'),
-    path('quiz/<int:quiz_id>/result/', views.quiz_result, name='quiz_result'),
+    path('quiz/<int:quiz_id>/autosave/', views.autosave_answers, name='autosave_answers'),
+    path('quiz/<int:quiz_id>/submit/', exam_views.submit_quiz, name='submit_quiz'),
+    path('quiz/<int:quiz_id>/result/', exam_views.quiz_result, name='quiz_result'),
 
     
     path('student/quiz/submitted/', views.student_dashboard_submitted, name='student_dashboard_submitted'),  
+
+    path('metrics', views.metrics, name='metrics'),
 ]
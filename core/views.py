@@ -2,15 +2,20 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.forms import AuthenticationForm
-from django.utils.timezone import now
+from django.db.models import Count, OuterRef, Prefetch, Subquery
+from django.db.models.functions import Coalesce
 from .models import (
     Quiz, Question, Option, QuizAttempt,
-    Response, Result, Teacher, Student
+    Response, Result, Teacher, Student, StudentQuizStatus
 )
 from .forms import (
     StudentRegistrationForm, TeacherRegistrationForm,
     QuizForm, QuestionForm
 )
+from . import importer
+from .dashboard import available_quizzes
+from .paper import attempt_paper
+from .submission import save_answers, saved_answers, submit_attempt
 
 def landing(request):
     return render(request, 'core/landing.html')
@@ -64,27 +69,36 @@ def logout_view(request):
 
 @login_required
 def student_dashboard(request):
-    student_user = request.user
-    submitted_quizzes = Quiz.objects.filter(quizattempt__student=student_user, quizattempt__completed=True).distinct()
-    available_quizzes = Quiz.objects.filter(
-        start_time__lte=now(), end_time__gte=now(), active=True
-    ).exclude(id__in=submitted_quizzes.values_list('id', flat=True))
-
-    results = {
-        result.quiz.id: result.score
-        for result in Result.objects.filter(student=student_user)
-    }
+    statuses = list(
+        StudentQuizStatus.objects.filter(student=request.user).select_related('quiz').order_by('quiz_id')
+    )
+    submitted = [s for s in statuses if s.status != StudentQuizStatus.IN_PROGRESS]
+    in_progress_ids = {s.quiz_id for s in statuses if s.status == StudentQuizStatus.IN_PROGRESS}
+    available = available_quizzes(exclude_ids={s.quiz_id for s in submitted})
 
     return render(request, 'core/student_dashboard.html', {
-        'available_quizzes': available_quizzes,
-        'submitted_quizzes': submitted_quizzes,
-        'results': results,
+        'available_quizzes': available,
+        'submitted_statuses': submitted,
+        'in_progress_ids': in_progress_ids,
     })
 
 @login_required
 def teacher_dashboard(request):
     teacher = get_object_or_404(Teacher, user=request.user)
-    quizzes = Quiz.objects.filter(created_by=teacher)
+    # Two subqueries rather than two joins, which would multiply a quiz's
+    # questions by its results just to count them.
+    questions = (
+        Question.objects.filter(quiz=OuterRef('pk')).order_by()
+        .values('quiz').annotate(count=Count('id')).values('count')
+    )
+    results = (
+        Result.objects.filter(quiz=OuterRef('pk')).order_by()
+        .values('quiz').annotate(count=Count('id')).values('count')
+    )
+    quizzes = Quiz.objects.filter(created_by=teacher).annotate(
+        question_count=Coalesce(Subquery(questions), 0),
+        submission_count=Coalesce(Subquery(results), 0),
+    )
     return render(request, 'core/teacher_dashboard.html', {'quizzes': quizzes})
 
 @login_required
@@ -119,13 +133,15 @@ def add_question(request, quiz_id):
         if correct_option_index is not None:
             correct_option_index = int(correct_option_index)
             question = Question.objects.create(quiz=quiz, text=question_text)
-            for i, option_text in enumerate(options):
-                Option.objects.create(
+            Option.objects.bulk_create([
+                Option(
                     question=question,
                     option_text=option_text,
                     is_correct=(i == correct_option_index),
                     order=i + 1
                 )
+                for i, option_text in enumerate(options)
+            ])
             return render(request, 'core/add_question.html', {
                 'quiz': quiz,
                 'question_added': True
@@ -133,14 +149,30 @@ def add_question(request, quiz_id):
 
     return render(request, 'core/add_question.html', {'quiz': quiz})
 
+@login_required
+def import_questions(request, quiz_id):
+    quiz = get_object_or_404(Quiz, id=quiz_id, created_by__user=request.user)
+    report = None
+
+    upload = request.FILES.get('questions_file')
+    if request.method == 'POST' and upload:
+        fmt = request.POST.get('format')
+        if fmt not in importer.FORMATS:
+            fmt = importer.detect_format(upload.name)
+        report = importer.import_questions(quiz, upload, fmt)
+
+    return render(request, 'core/add_question.html', {'quiz': quiz, 'import_report': report})
+
 @login_required
 def preview_quiz(request, quiz_id):
     quiz = get_object_or_404(Quiz, id=quiz_id)
-    questions = quiz.questions.prefetch_related('options_set')
+    questions = quiz.questions.prefetch_related(
+        Prefetch('options_set', queryset=Option.objects.order_by('order'))
+    )
 
     quiz_data = []
     for question in questions:
-        options = question.options_set.all().order_by('order')
+        options = question.options_set.all()
         quiz_data.append({
             'question': question,
             'options': options
@@ -152,6 +184,10 @@ def preview_quiz(request, quiz_id):
     })
 
 from django.shortcuts import render, redirect, get_object_or_404
+from django.http import JsonResponse
+from django.views.decorators.http import require_POST
+from .attempts import acquire_attempt, current_attempt
+from .deadlines import deadline_passed, quiz_open
 from .models import Quiz, QuizAttempt, Response
 from django.contrib.auth.decorators import login_required
 
@@ -160,102 +196,109 @@ def take_quiz(request, quiz_id):
     quiz = get_object_or_404(Quiz, id=quiz_id)
 
     
-    attempt = QuizAttempt.objects.filter(student=request.user, quiz=quiz, completed=False).first()
-
-    
-    if not attempt:
-        attempt = QuizAttempt.objects.create(student=request.user, quiz=quiz)
+    attempt, created = current_attempt(request.user, quiz), False
+    if attempt is None or attempt.completed:
+        # One sitting per student: nothing new starts once it is submitted
+        # or the quiz has closed.
+        if attempt is not None:
+            return redirect('quiz_result', quiz_id=quiz.id)
+        if not quiz_open(quiz):
+            return redirect('student_dashboard')
+        attempt, created = acquire_attempt(request.user, quiz)
 
-    questions = quiz.questions.prefetch_related('options_set')
+    if request.method == 'POST' or (not created and deadline_passed(attempt)):
+        submit_attempt(attempt, request.POST, strict=False)
+        return redirect('quiz_result', quiz_id=quiz.id)
 
-    if request.method == 'POST':
-        
-        for question in questions:
-            selected_option_id = request.POST.get(f'question_{question.id}')
-            if selected_option_id:
-                try:
-                    selected_option = Option.objects.get(id=selected_option_id, question=question)
-                    Response.objects.create(
-                        attempt=attempt,
-                        question=question,
-                        selected_option=selected_option
-                    )
-                except Option.DoesNotExist:
-                    continue
-
-      
-        attempt.completed = True
-        attempt.save()
+    paper = attempt_paper(quiz, attempt)
+    saved = {} if created else saved_answers(attempt)
+    return render(request, 'core/take_quiz.html', {
+        'quiz': quiz,
+        'paper': paper,
+        'attempt': attempt,
+        'saved_answers': {f'question_{q}': o for q, o in saved.items()},
+    })
 
-        return redirect('quiz_result', quiz_id=quiz.id)
+@login_required
+@require_POST
+def autosave_answers(request, quiz_id):
+    attempt = QuizAttempt.objects.filter(
+        student=request.user, quiz_id=quiz_id, completed=False
+    ).select_related('quiz').first()
+    if attempt is None or deadline_passed(attempt):
+        return JsonResponse({'error': 'No attempt in progress.'}, status=409)
 
-    return render(request, 'core/take_quiz.html', {'quiz': quiz, 'questions': questions, 'attempt': attempt})
+    saved, flushed = save_answers(attempt, request.POST)
+    return JsonResponse({'saved': saved, 'flushed': flushed})
 
 from django.shortcuts import get_object_or_404, render
 from django.contrib.auth.decorators import login_required
-from .models import Quiz, QuizAttempt, Response, Result
+from django.http import Http404
+from .models import Quiz, QuizAttempt, Response, Result, Option
+from .scoring import score_attempt
+from .submission_queue import is_grading
 
 @login_required
 def quiz_result(request, quiz_id):
-    quiz    = get_object_or_404(Quiz, id=quiz_id)
-    attempt = get_object_or_404(QuizAttempt,
-                                student=request.user,
-                                quiz=quiz,
-                                completed=True)
-
-    responses = Response.objects.filter(attempt=attempt) \
-                                .select_related('question', 'selected_option')
-
-    
-    total_questions = quiz.questions.count()
-
-   
-    score = responses.filter(selected_option__is_correct=True).count()
-
-    Result.objects.update_or_create(
-        attempt=attempt,
-        defaults={
-            'quiz': quiz,
-            'student': request.user,
-            'score': score,
-            'total_attempted': responses.count(),
-        }
+    result = (
+        Result.objects
+        .filter(quiz_id=quiz_id, student=request.user)
+        .select_related('quiz', 'attempt')
+        .order_by('-id')
+        .first()
     )
 
+    if result is None:
+        # Attempts completed before scoring moved to submit time.
+        attempt = QuizAttempt.objects.filter(
+            student=request.user, quiz_id=quiz_id, completed=True
+        ).select_related('quiz').first()
+        if attempt is None:
+            raise Http404("No completed attempt for this quiz.")
+        if is_grading(attempt.id):
+            return render(request, 'core/quiz_result.html', {'quiz': attempt.quiz, 'grading': True})
+        result = score_attempt(attempt)
+
+    responses = Response.objects.filter(attempt_id=result.attempt_id) \
+                                .select_related('question', 'selected_option') \
+                                .prefetch_related(Prefetch(
+                                    'question__options_set',
+                                    queryset=Option.objects.filter(is_correct=True),
+                                ))
+
     return render(request, 'core/quiz_result.html', {
-        'quiz': quiz,
+        'quiz': result.quiz,
         'responses': responses,
-        'score': score,
-        'total': total_questions,   
-        'attempt': attempt
+        'score': result.score,
+        'total': result.total_questions,
+        'attempt': result.attempt
     })
 
 
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import render, get_object_or_404
+from django.http import StreamingHttpResponse
+from .leaderboard import leaderboard_page, parse_cursor, stream_leaderboard
 from .models import Quiz, Result
 
 @login_required
 def view_responses(request, quiz_id):
-   
     quiz = get_object_or_404(Quiz, id=quiz_id, created_by__user=request.user)
 
-   
-    results = (
-        Result.objects
-        .filter(quiz=quiz)
-        .select_related('student')  
-        .order_by('-score')         
-    )
+    if request.GET.get('stream'):
+        return StreamingHttpResponse(stream_leaderboard(request, quiz))
+
+    results, next_cursor = leaderboard_page(quiz, parse_cursor(request.GET.get('after')))
 
     return render(request, 'core/view_responses.html', {
         'quiz': quiz,
         'results': results,
+        'next_cursor': next_cursor,
     })
 @login_required
 def student_dashboard_submitted(request):
     student = request.user
-    results = Result.objects.filter(student=student)
+    results = Result.objects.filter(student=student).select_related('quiz')
     attempted_quizzes = [{
         'quiz': result.quiz,
         'score': result.score,
@@ -273,30 +316,47 @@ from .models import Quiz, QuizAttempt, Response, Option
 @login_required
 def submit_quiz(request, quiz_id):
     quiz    = get_object_or_404(Quiz, id=quiz_id)
-    attempt = QuizAttempt.objects.filter(student=request.user, quiz=quiz, completed=False).first()
+    attempt = QuizAttempt.objects.filter(
+        student=request.user, quiz=quiz, completed=False
+    ).select_related('quiz').first()
     if not attempt:
         return redirect('quiz_result', quiz_id=quiz.id)
 
     if request.method == 'POST':
-       
-        Response.objects.filter(attempt=attempt).delete()
-
-        
-        for question in quiz.questions.all():
-            sel_id = request.POST.get(f"question_{question.id}")
-            if sel_id:
-                opt = get_object_or_404(Option, id=sel_id, question=question)
-                Response.objects.create(
-                    attempt=attempt,
-                    question=question,
-                    selected_option=opt
-                )
-
-       
-        attempt.completed = True
-        attempt.save()
-
+        submit_attempt(attempt, request.POST)
         return redirect('quiz_result', quiz_id=quiz.id)
 
    
     return redirect('take_quiz', quiz_id=quiz.id)
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from .metrics import registry
+
+def metrics(request):
+    if not getattr(settings, 'QUIZ_METRICS', False):
+        raise Http404("Metrics are disabled.")
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+from .export import FORMATS, KINDS, export_lines
+
+@login_required
+def export_results(request, quiz_id):
+    quiz = get_object_or_404(Quiz, id=quiz_id, created_by__user=request.user)
+    kind = request.GET.get('kind', 'results')
+    fmt = request.GET.get('format', 'csv')
+    if kind not in KINDS or fmt not in FORMATS:
+        raise Http404("Unknown export.")
+
+    content_type = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    response = StreamingHttpResponse(export_lines(quiz, kind, fmt), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="quiz-{quiz.id}-{kind}.{fmt}"'
+    return response
+
+from .analytics import quiz_analytics as build_quiz_analytics
+
+@login_required
+def quiz_analytics(request, quiz_id):
+    quiz = get_object_or_404(Quiz, id=quiz_id, created_by__user=request.user)
+    analytics = build_quiz_analytics(quiz, refresh=bool(request.GET.get('refresh')))
+    return render(request, 'core/quiz_analytics.html', {'quiz': quiz, **analytics})
@@ -0,0 +1,34 @@
+import time
+
+from django.utils import timezone
+
+from .answer_key import get_answer_key
+from .dashboard import SCHEDULE_TIMEOUT, get_quiz_schedule
+from .models import Option, Question
+from .paper import get_paper
+
+
+def warm_quiz(quiz):
+    """Precompute everything a sitting of ``quiz`` reads.
+
+    Returns ``(stage, seconds)`` pairs so the lead time can be sized.
+    """
+    timings = []
+
+    def stage(name, func):
+        start = time.perf_counter()
+        func()
+        timings.append((name, time.perf_counter() - start))
+
+    stage('questions', lambda: (
+        list(Question.objects.filter(quiz=quiz)),
+        list(Option.objects.filter(question__quiz=quiz)),
+    ))
+    stage('answer key', lambda: get_answer_key(quiz.id, refresh=True))
+    stage('paper', lambda: get_paper(quiz, refresh=True))
+    # A schedule cached for the usual minute would expire long before the
+    # sitting; keep this one until the quiz has started.
+    lead = (quiz.start_time - timezone.now()).total_seconds() if quiz.start_time else 0
+    stage('dashboard', lambda: get_quiz_schedule(
+        refresh=True, timeout=max(lead, 0) + SCHEDULE_TIMEOUT))
+    return timings
@@ -3,6 +3,33 @@ ASGI config for quiz_portal project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Deployment modes:
+
+* WSGI (default): ``gunicorn quiz_portal.wsgi --workers 4 --threads 8``.
+  Every request holds a worker thread until it returns.
+* ASGI: ``QUIZ_ASYNC_VIEWS=1 uvicorn quiz_portal.asgi:application --workers 4``.
+  student_dashboard, submit_quiz and quiz_result are then served by the
+  async views in ``core/async_views.py``. Their reads wait on the event
+  loop; the sync parts (the async ORM's queries, a submit's write
+  transaction and template rendering) run on a thread Django's ASGI
+  handler gives each request (asgiref's ThreadSensitiveContext), not on
+  one thread shared by the whole process, so concurrent submits are not
+  serialized per worker. They stay on that thread on purpose: it holds the
+  request's one database connection, and moving the write or the render to
+  a pooled thread (``thread_sensitive=False``) takes a second connection
+  per request, which with DATABASE_POOL=1 deadlocks a burst once every
+  pool connection belongs to a request waiting for another. The remaining
+  views still run in Django's thread pool. WhiteNoise is sync-only, so in
+  this mode static files are served by the handler below. Put a reverse
+  proxy or CDN in front of ``/static/`` for real traffic.
+
+  Use this mode with PostgreSQL and DATABASE_POOL=1 (see settings.py).
+  SQLite lets one writer in at a time, so the extra concurrency only
+  turns into lock waits; the WSGI thread pool is what keeps SQLite usable.
+
+``python manage.py bench_asgi`` runs the same burst of submitters against
+both modes side by side.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -14,3 +41,10 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'quiz_portal.settings')
 
 application = get_asgi_application()
+
+from django.conf import settings  # noqa: E402
+
+if settings.QUIZ_ASYNC_VIEWS:
+    from django.contrib.staticfiles.handlers import ASGIStaticFilesHandler
+
+    application = ASGIStaticFilesHandler(application)
@@ -1,6 +1,8 @@
 from pathlib import Path
 
 import os
+import sys
+import tempfile
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 SECRET_KEY = os.environ.get("SECRET_KEY", "unsafe-dev-key")
@@ -20,6 +22,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -52,12 +55,57 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'quiz_portal.wsgi.application'
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# SQLite by default; DATABASE_ENGINE=postgresql for exam-day deployments.
+DATABASE_ENGINE = os.environ.get('DATABASE_ENGINE', 'sqlite')
+
+if DATABASE_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('DATABASE_NAME', 'quiz_portal'),
+            'USER': os.environ.get('DATABASE_USER', 'postgres'),
+            'PASSWORD': os.environ.get('DATABASE_PASSWORD', ''),
+            'HOST': os.environ.get('DATABASE_HOST', 'localhost'),
+            'PORT': os.environ.get('DATABASE_PORT', '5432'),
+            # Reuse each thread's connection across requests, after checking it still works.
+            'CONN_MAX_AGE': int(os.environ.get('DATABASE_CONN_MAX_AGE', 60)),
+            'CONN_HEALTH_CHECKS': True,
+        }
     }
-}
+    if os.environ.get('DATABASE_POOL', '') == '1':
+        # Django's connection pool (needs psycopg 3 with psycopg-pool). One pool
+        # per process replaces persistent connections, and also serves ASGI,
+        # where persistent connections are not reused.
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS'] = {
+            'pool': {
+                'min_size': int(os.environ.get('DATABASE_POOL_MIN_SIZE', 2)),
+                'max_size': int(os.environ.get('DATABASE_POOL_MAX_SIZE', 20)),
+                'timeout': float(os.environ.get('DATABASE_POOL_TIMEOUT', 30)),
+            },
+        }
+elif DATABASE_ENGINE == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('DATABASE_NAME', BASE_DIR / 'db.sqlite3'),
+            # A file rather than the in-memory default: tests with concurrent
+            # connections then wait on the busy timeout instead of failing
+            # with "database table is locked".
+            'TEST': {'NAME': os.path.join(tempfile.gettempdir(), 'quiz_portal_test.sqlite3')},
+        }
+    }
+    if os.environ.get('SQLITE_TUNING', '1') == '1':
+        # WAL lets readers run alongside the single writer. Transactions take
+        # the write lock up front so they queue on the busy timeout instead
+        # of failing with "database is locked" when a read upgrades to a write.
+        DATABASES['default']['OPTIONS'] = {
+            'timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT', 20)),
+            'transaction_mode': 'IMMEDIATE',
+            'init_command': 'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL',
+        }
+else:
+    raise ValueError(f"Unsupported DATABASE_ENGINE {DATABASE_ENGINE!r}; use 'sqlite' or 'postgresql'.")
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -91,7 +139,100 @@ LOGIN_REDIRECT_URL = '/'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
-SESSION_ENGINE = 'django.contrib.sessions.backends.db'  
+# Cache layer for the application caches (answer keys, papers, dashboard
+# schedule), sessions and autosaves. It must be shared by every worker: the
+# answer key of a quiz is only dropped in the cache that saw the change.
+# The default file cache is shared on one host; use Redis (pip install
+# redis) across hosts, picked up automatically when REDIS_URL is set.
+# Exam-day installs need Redis, run with maxmemory-policy noeviction: it is
+# the only shared backend that coalesces autosaves (see
+# core.submission.flush_interval) and never drops what the 'state' cache
+# holds. locmem is per process and only fits a single-process server; the
+# test suite uses it so it never reads, or clears, the site's shared cache.
+TESTING = sys.argv[1:2] == ['test']
+REDIS_URL = os.environ.get('REDIS_URL', '')
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'redis' if REDIS_URL else 'locmem' if TESTING else 'file')
+CACHE_LOCATION = os.environ.get('CACHE_LOCATION', '')
+# Entries the locmem and file caches hold before they cull a third of them
+# (the file cache picks them at random and lists its directory on every
+# set). 'default' needs a few per quiz and 'sessions' one per signed-in
+# user; both are rebuilt from the database after a cull.
+CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES', 10000))
+
+
+def cache_config(name, max_entries=CACHE_MAX_ENTRIES):
+    if CACHE_BACKEND == 'locmem':
+        return {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': f'quiz-portal-{name}',
+            'OPTIONS': {'MAX_ENTRIES': max_entries},
+        }
+    if CACHE_BACKEND == 'file':
+        location = CACHE_LOCATION or os.path.join(tempfile.gettempdir(), 'quiz_portal_cache')
+        return {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.path.join(location, name),
+            'OPTIONS': {'MAX_ENTRIES': max_entries},
+        }
+    if CACHE_BACKEND == 'redis':
+        return {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_LOCATION or REDIS_URL or 'redis://127.0.0.1:6379/0',
+            'KEY_PREFIX': f'quiz-portal-{name}',
+        }
+    raise ValueError(f"Unsupported CACHE_BACKEND {CACHE_BACKEND!r}; use 'locmem', 'file' or 'redis'.")
+
+
+# Benchmarks run their Redis caches in this database, which their clear()
+# calls flush; it must be one the site does not use.
+BENCH_REDIS_DB = int(os.environ.get('BENCH_REDIS_DB', 15))
+
+
+# Sessions get their own cache so a crowd of logins cannot evict answer keys.
+# 'state' holds what must not be evicted: the autosaved answers of attempts
+# in progress, which the database does not have yet, and the quiz content
+# versions every process checks its answer keys against. It never culls.
+CACHES = {
+    'default': cache_config('default'),
+    'sessions': cache_config('sessions'),
+    'state': cache_config('state', max_entries=sys.maxsize),
+}
+
+# Sessions are read from the cache and written through to the database, so
+# an authenticated request no longer needs a session SELECT.
+SESSION_ENGINE = os.environ.get('SESSION_ENGINE', 'django.contrib.sessions.backends.cached_db')
+SESSION_CACHE_ALIAS = 'sessions'
 SESSION_EXPIRE_AT_BROWSER_CLOSE = False 
 
 STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
+
+# Serve take_quiz from a rendered copy of each quiz's question block.
+QUIZ_PAPER_CACHE = True
+
+# Per-view query/latency metrics served at /metrics (Prometheus text format).
+QUIZ_METRICS = os.environ.get('QUIZ_METRICS', '') == '1'
+# Log queries slower than this many milliseconds with their view name.
+QUIZ_METRICS_SLOW_QUERY_MS = (
+    float(os.environ['QUIZ_METRICS_SLOW_QUERY_MS']) if os.environ.get('QUIZ_METRICS_SLOW_QUERY_MS') else None
+)
+
+# Autosaved answers are coalesced in the cache and written to the database at
+# most this often per attempt; 0 writes every autosave straight through, as
+# does a file cache (see core.submission.flush_interval).
+QUIZ_AUTOSAVE_FLUSH_SECONDS = int(os.environ.get('QUIZ_AUTOSAVE_FLUSH_SECONDS', 30))
+
+# Queue submissions for `manage.py process_submissions` instead of grading
+# them inside the request, to absorb the burst at a quiz's end_time.
+QUIZ_SUBMIT_QUEUE = os.environ.get('QUIZ_SUBMIT_QUEUE', '') == '1'
+
+# Answers posted this many seconds after an attempt's deadline still count;
+# later ones are ignored and `manage.py sweep_attempts` submits the attempt.
+QUIZ_DEADLINE_GRACE_SECONDS = int(os.environ.get('QUIZ_DEADLINE_GRACE_SECONDS', 30))
+
+# Serve student_dashboard, submit_quiz and quiz_result as async views; only
+# worthwhile under an ASGI server (see quiz_portal/asgi.py).
+QUIZ_ASYNC_VIEWS = os.environ.get('QUIZ_ASYNC_VIEWS', '') == '1'
+if QUIZ_ASYNC_VIEWS:
+    # WhiteNoise is sync-only and would hold a thread for every request;
+    # asgi.py serves the static files instead.
+    MIDDLEWARE.remove('whitenoise.middleware.WhiteNoiseMiddleware')